@@ -24,8 +24,12 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Optional, Any, List, Tuple
+from typing import Dict, Iterator, Optional, Any, List, Tuple
 
+try:
+    import orjson  # optional: faster JSON encoding for results/checkpoints
+except ImportError:
+    orjson = None
 
 
 AUDIO_EXTENSIONS = {
@@ -53,35 +57,57 @@ DEFAULT_DUMP_EVERY: Optional[int] = None
 class RateLimiter:
     """
     Ensures a minimum time gap between calls across all workers.
-    Works with any concurrency by serializing access to the 'wait' window.
+    Each caller reserves the next free slot under the lock and then sleeps outside it,
+    so concurrent workers queue up their start times without blocking each other.
     """
 
     def __init__(self, min_interval_seconds: float):
         self.min_interval = float(min_interval_seconds)
         self._lock = asyncio.Lock()
-        self._last_ts = 0.0
+        self._last_ts: Optional[float] = None
 
     async def wait(self) -> None:
         loop = asyncio.get_event_loop()
         async with self._lock:
             now = loop.time()
-            wait_for = self.min_interval - (now - self._last_ts)
-            if wait_for > 0:
-                await asyncio.sleep(wait_for)
-            # Record the moment we release the limiter
-            self._last_ts = loop.time()
+            if self._last_ts is None:
+                target = now
+            else:
+                target = max(now, self._last_ts + self.min_interval)
+            # Reserve the slot; the next caller computes its own slot from this one
+            self._last_ts = target
+        wait_for = target - now
+        if wait_for > 0:
+            await asyncio.sleep(wait_for)
+
+
+def _walk_audio_files(root: str, recursive: bool, top: bool = True) -> Iterator[Path]:
+    """
+    Yield audio files under 'root' using os.scandir, which reuses the directory entry type
+    instead of stat-ing every entry; Path objects are only built for accepted files.
+    Like Path.rglob, subdirectories that cannot be read are skipped; only an unreadable
+    root is an error.
+    """
+    try:
+        it = os.scandir(root)
+    except OSError:
+        if top:
+            raise
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _walk_audio_files(entry.path, recursive, top=False)
+            elif entry.is_file():
+                name = entry.name
+                dot = name.rfind(".")
+                if dot > 0 and name[dot:].lower() in AUDIO_EXTENSIONS:
+                    yield Path(entry.path)
 
 
 def list_audio_files(root: Path, recursive: bool) -> List[Path]:
-    if recursive:
-        it = root.rglob("*")
-    else:
-        it = root.iterdir()
-    return [
-        p
-        for p in it
-        if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS
-    ]
+    return list(_walk_audio_files(str(root), recursive))
 
 
 def is_unknown_text(text: Optional[str]) -> bool:
@@ -94,8 +120,10 @@ def is_unknown_text(text: Optional[str]) -> bool:
     """
     if text is None:
         return True
-    t = str(text).strip().lower()
-    return t == "unknown" or t.startswith("unknown ")
+    # Only the first 8 characters decide, so lower-case just those instead of the whole value
+    t = str(text).strip()
+    head = t[:8].lower()
+    return head == "unknown " or (head == "unknown" and len(t) == 7)
 
 
 def extract_metadata(out: Dict[str, Any]) -> Optional[Dict[str, Optional[str]]]:
@@ -123,13 +151,29 @@ def extract_metadata(out: Dict[str, Any]) -> Optional[Dict[str, Optional[str]]]:
     return {"author": author, "album": album, "song": song}
 
 
-async def recognize_file(file_path: Path, limiter: RateLimiter, song_nr: int, total_songs: int, recognizer_script: Optional[str] = None) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[str]]:
+async def _recognize_in_process(file_path: Path, shazam: Any) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[str]]:
+    """
+    Recognize a file with a shared in-process Shazam client.
+    Avoids spawning an interpreter (and re-importing shazamio) per file.
+    """
+    try:
+        out_obj = await shazam.recognize(str(file_path))
+    except Exception as e:
+        return None, f"RecognizeError: {type(e).__name__}: {e}"
+    return extract_metadata(out_obj or {}), None
+
+
+async def recognize_file(file_path: Path, limiter: RateLimiter, song_nr: int, total_songs: int, recognizer_script: Optional[str] = None, shazam: Any = None) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[str]]:
     # Respect global rate limiter
     await limiter.wait()
 
-    # Run single-file recognizer in a subprocess to capture and prefix its stderr (ffmpeg/shazam native output)
-    script_path = Path(recognizer_script) if recognizer_script else (Path(__file__).parent / "recognize_one.py")
-    cmd = [sys.executable, "-u", str(script_path), str(file_path)]
+    # Default path: recognize in-process with the shared Shazam client (run() creates it
+    # exactly when no recognizer script was given)
+    if not recognizer_script:
+        return await _recognize_in_process(file_path, shazam)
+
+    # Run the given single-file recognizer in a subprocess to capture and prefix its stderr (ffmpeg/shazam native output)
+    cmd = [sys.executable, "-u", recognizer_script, str(file_path)]
 
     proc = await asyncio.create_subprocess_exec(
         *cmd,
@@ -178,13 +222,28 @@ async def recognize_file(file_path: Path, limiter: RateLimiter, song_nr: int, to
 def atomic_write_json(path: Path, data: Any) -> None:
     """
     Atomically write JSON to 'path' via a temp file + replace.
-    Ensures parent directories exist.
+    Ensures parent directories exist. The temp file is fsync'ed before the rename and the
+    directory afterwards (POSIX), so a crash never leaves a truncated file under 'path'.
     """
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        with tmp.open("wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            f.flush()
+            os.fsync(f.fileno())
+    else:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
     os.replace(str(tmp), str(path))
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(str(path.parent), os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
 
 async def run(args) -> int:
@@ -219,79 +278,129 @@ async def run(args) -> int:
         print("[INFO] No audio files found to process.", file=sys.stderr)
         return 0
 
+    # Recognize in-process with one shared Shazam client unless a recognizer script was given
+    shazam = None
+    if not args.recognizer_script:
+        try:
+            from shazamio import Shazam  # local import to allow tests without shazamio
+        except ImportError as e:
+            print(f"[ERROR] shazamio is required for recognition ({e}). Install it with: pip install shazamio", file=sys.stderr)
+            return 2
+        shazam = Shazam()
+
     # Initialize rate limiter
     limiter = RateLimiter(args.delay)
 
     total = len(files)
     results: Dict[str, Dict[str, Optional[str]]] = {}
-    errors: List[Dict[str, str]] = []
-    unrecognized: List[Tuple[str, str]] = []
+    unrecognized_count = 0
     processed = 0
     recognized_count = 0
     error_count = 0
-    progress_lock = asyncio.Lock()
-    sem = asyncio.Semaphore(max(1, int(args.concurrency)))
-
-    async def worker(idx: int, p: Path):
-        nonlocal processed, recognized_count, error_count
-        async with sem:
-            meta, err = await recognize_file(p, limiter, idx, total, args.recognizer_script)
-            async with progress_lock:
-                if meta:
-                    # Augment with unknown flags for downstream organizers/schemas
-                    meta = dict(meta)
-                    meta["author_unknown"] = is_unknown_text(meta.get("author"))
-                    meta["album_unknown"] = is_unknown_text(meta.get("album"))
-                    meta["song_unknown"] = is_unknown_text(meta.get("song"))
-                    results[str(p)] = meta
-            if err:
-                async with progress_lock:
-                    errors.append({"file": str(p), "error": err})
-            # Update progress counters and print progress
-            async with progress_lock:
-                processed += 1
-                if meta:
-                    recognized_count += 1
-                else:
-                    # Track unrecognized files (either due to error or no match)
-                    unrecognized.append((str(p), err or "NO_MATCH"))
-                if err:
-                    error_count += 1
-                percent = (processed / total) * 100 if total else 100.0
-                status = "OK" if meta else ("ERROR" if err else "NO_MATCH")
-                if meta:
-                    details = f" -> {meta.get('author','?')} - {meta.get('song','?')}"
-                elif err:
-                    details = f" - {err}"
-                else:
-                    details = " - NO_MATCH"
-                print(f"[PROGRESS] {processed}/{total} ({percent:.1f}%) {status}: {p}{details}", file=sys.stderr)
-                if args.dump_every and int(args.dump_every) > 0 and (processed % int(args.dump_every) == 0):
+    dump_every = int(args.dump_every) if args.dump_every else 0
+    checkpoint_entries: Optional[int] = None  # results count at the last checkpoint
+    checkpoint_requested = False
+    checkpoint_due = asyncio.Event()
+    finished = False
+    log_q: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    # Fixed pool of long-lived workers pulling from a queue: live tasks are O(concurrency), not O(files)
+    queue: "asyncio.Queue[Tuple[int, Path]]" = asyncio.Queue()
+    for item in enumerate(files, start=1):
+        queue.put_nowait(item)
+
+    async def logger():
+        # Single consumer printing progress lines, so workers never wait on stderr
+        while True:
+            msg = await log_q.get()
+            if msg is None:
+                return
+            print(msg, file=sys.stderr)
+
+    async def checkpointer():
+        # Writes checkpoints when signalled; only one write is in flight and bursts of
+        # completions during a write coalesce into the next one
+        nonlocal checkpoint_entries, checkpoint_requested
+        while True:
+            await checkpoint_due.wait()
+            checkpoint_due.clear()
+            # Skip checkpoints that would rewrite identical content (nothing recognized since the last one)
+            if checkpoint_requested:
+                checkpoint_requested = False
+                if len(results) != checkpoint_entries:
+                    # Snapshot on the loop, serialize + fsync on a worker thread so recognition keeps running
+                    snapshot = {"$schema": "https://example.com/schemas/recognized.schema.json", **results}
+                    done_at = processed
                     try:
-                        atomic_write_json(output_path, {"$schema": "https://example.com/schemas/recognized.schema.json", **results})
-                        print(f"[INFO] Checkpoint: wrote {output_path} with {len(results)} entries after {processed}/{total} processed.", file=sys.stderr)
+                        await asyncio.get_running_loop().run_in_executor(None, atomic_write_json, output_path, snapshot)
+                        checkpoint_entries = len(snapshot) - 1
+                        log_q.put_nowait(f"[INFO] Checkpoint: wrote {output_path} with {checkpoint_entries} entries after {done_at}/{total} processed.")
                     except Exception as e:
-                        print(f"[WARNING] Failed to write checkpoint to {output_path}: {type(e).__name__}: {e}", file=sys.stderr)
-
-    await asyncio.gather(*(worker(i, p) for i, p in enumerate(files, start=1)))
-
-    # Write output JSON (include top-level $schema for validation)
-    atomic_write_json(output_path, {"$schema": "https://example.com/schemas/recognized.schema.json", **results})
-
-    # Write errors log (JSON Lines: one object per line: {"file": "...", "error": "..."})
+                        log_q.put_nowait(f"[WARNING] Failed to write checkpoint to {output_path}: {type(e).__name__}: {e}")
+            if finished:
+                return
+
+    async def process(idx: int, p: Path):
+        nonlocal processed, recognized_count, error_count, unrecognized_count, checkpoint_requested
+        meta, err = await recognize_file(p, limiter, idx, total, args.recognizer_script, shazam)
+        # No awaits below: the event loop is single-threaded, so these updates need no lock
+        if meta:
+            # Augment with unknown flags for downstream organizers/schemas
+            meta = dict(meta)
+            meta["author_unknown"] = is_unknown_text(meta.get("author"))
+            meta["album_unknown"] = is_unknown_text(meta.get("album"))
+            meta["song_unknown"] = is_unknown_text(meta.get("song"))
+            results[str(p)] = meta
+        if err:
+            json.dump({"file": str(p), "error": err}, ef, ensure_ascii=False)
+            ef.write("\n")
+        # Update progress counters and queue the progress line
+        processed += 1
+        if meta:
+            recognized_count += 1
+        else:
+            # Track unrecognized files (either due to error or no match)
+            unrecognized_count += 1
+            uf.write(f"{p}\t{err or 'NO_MATCH'}\n")
+        if err:
+            error_count += 1
+        percent = (processed / total) * 100 if total else 100.0
+        status = "OK" if meta else ("ERROR" if err else "NO_MATCH")
+        if meta:
+            details = f" -> {meta.get('author','?')} - {meta.get('song','?')}"
+        elif err:
+            details = f" - {err}"
+        else:
+            details = " - NO_MATCH"
+        log_q.put_nowait(f"[PROGRESS] {processed}/{total} ({percent:.1f}%) {status}: {p}{details}")
+        if dump_every > 0 and processed % dump_every == 0:
+            checkpoint_requested = True
+            checkpoint_due.set()
+
+    async def worker():
+        while not queue.empty():
+            idx, p = queue.get_nowait()
+            await process(idx, p)
+
+    # Errors log (JSON Lines: one object per line: {"file": "...", "error": "..."}) and unrecognized
+    # text file (one line per file: "<path>\t<reason>") are streamed line by line as files complete,
+    # so partial logs are available during the run and nothing accumulates in memory
     errors_path = output_path.with_name(output_path.stem + ".errors.jsonl")
+    unrec_path = output_path.with_name(output_path.stem + ".unrecognized.txt")
     errors_path.parent.mkdir(parents=True, exist_ok=True)
-    with errors_path.open("w", encoding="utf-8") as ef:
-        for entry in errors:
-            json.dump(entry, ef, ensure_ascii=False)
-            ef.write("\n")
+    with errors_path.open("w", encoding="utf-8", buffering=1) as ef, unrec_path.open("w", encoding="utf-8", buffering=1) as uf:
+        logger_task = asyncio.create_task(logger())
+        checkpoint_task = asyncio.create_task(checkpointer()) if dump_every > 0 else None
+        await asyncio.gather(*(worker() for _ in range(min(total, max(1, int(args.concurrency))))))
+        finished = True
+        if checkpoint_task is not None:
+            checkpoint_due.set()
+            await checkpoint_task
+        log_q.put_nowait(None)
+        await logger_task
 
-    # Write unrecognized text file (one line per file: "<path>\t<reason>")
-    unrec_path = output_path.with_name(output_path.stem + ".unrecognized.txt")
-    unrec_path.parent.mkdir(parents=True, exist_ok=True)
-    with unrec_path.open("w", encoding="utf-8") as uf:
-        for path_str, reason in unrecognized:
-            uf.write(f"{path_str}\t{reason}\n")
+    # Write output JSON (include top-level $schema for validation)
+    atomic_write_json(output_path, {"$schema": "https://example.com/schemas/recognized.schema.json", **results})
 
     # Write error log explanation/legend
     legend_path = output_path.with_name(output_path.stem + ".errors.README.txt")
@@ -299,7 +408,9 @@ async def run(args) -> int:
     legend_text = (
         "Error logs explanation (JSON Lines): one JSON object per line with keys 'file' and 'error'.\n"
         "Legend:\n"
-        " - ChildExit <code>: recognize_one.py (Shazam/ffmpeg) exited non-zero. Check the per-file\n"
+        " - RecognizeError: <Type>: the in-process Shazam recognizer raised an exception for the file.\n"
+        "   Common causes: network/transient API errors, decoding issues, or service throttling.\n"
+        " - ChildExit <code>: the --recognizer-script subprocess (Shazam/ffmpeg) exited non-zero. Check the per-file\n"
         "   stderr lines (prefixed with the source file path) printed during processing for details.\n"
         "   Common causes: network/transient API errors, decoding issues, or service throttling.\n"
         " - ParseError <Type>: could not parse JSON from the recognizer subprocess; this typically means\n"
@@ -320,13 +431,13 @@ async def run(args) -> int:
 
     print(
         f"[INFO] Recognized {recognized_count} / {len(files)} files. Errors: {error_count}. "
-        f"Wrote results to: {output_path}. Unrecognized: {len(unrecognized)} -> {unrec_path}. "
+        f"Wrote results to: {output_path}. Unrecognized: {unrecognized_count} -> {unrec_path}. "
         f"Error log: {errors_path}. Legend: {legend_path}"
     )
     return 0
 
 
-def parse_args():
+def parse_args(argv: Optional[List[str]] = None):
     ap = argparse.ArgumentParser(
         description="Batch recognize songs in a folder using Shazam (shazamio).",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -373,20 +484,21 @@ def parse_args():
         "--recognizer-script",
         type=str,
         default=None,
-        help="Path to a Python script to use instead of recognize_one.py (for testing or custom backends)",
+        help="Path to a Python script (e.g. recognize_one.py) run per file in a subprocess instead of recognizing in-process (for testing or custom backends)",
     )
-    return ap.parse_args()
+    return ap.parse_args(argv)
 
 
-def main():
-    args = parse_args()
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the CLI with argv (defaults to sys.argv[1:]) and return the exit code."""
+    args = parse_args(argv)
     try:
         code = asyncio.run(run(args))
     except KeyboardInterrupt:
         print("[INFO] Interrupted by user.", file=sys.stderr)
         code = 130
-    sys.exit(code)
+    return code
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -28,17 +28,56 @@ Key features:
 """
 
 import argparse
+import errno
+import filecmp
 import json
 import os
 import re
 import hashlib
+import mmap
 import shutil
+import sqlite3
 import sys
 import unicodedata
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from collections import defaultdict, deque
+from contextlib import redirect_stdout
+from functools import lru_cache, partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set, TextIO, Tuple, Union
 from datetime import datetime, timezone
 
+try:
+    import orjson  # optional: faster parsing of large mappings and writing of the duplicates report
+except ImportError:
+    orjson = None
+
+try:
+    import blake3  # optional: much faster content fingerprints for duplicate detection
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash  # optional: fast non-cryptographic fingerprints (xxh3-128)
+except ImportError:
+    xxhash = None
+
+# Content hashes only fingerprint files for duplicate detection; there is no adversary,
+# so the fastest available algorithm is used unless --hash asks for a specific one
+HASH_ALGORITHMS = ("blake3", "xxh3", "sha256")
+
+
+# Path separators, control characters and reserved/unsafe characters are replaced with '-' in path components
+_SANITIZE_TABLE = {i: "-" for i in range(32)}
+_SANITIZE_TABLE.update({ord(c): "-" for c in '<>:"|?*/\\'})
+_WS_RE = re.compile(r"\s+")
+# Dangling punctuation left around removed unknown values, and runs of whitespace
+_TRIM_RE = re.compile(r"^[\s\-_.(),;:]+|[\s\-_.(),;:]+$")
+_MULTISPACE_RE = re.compile(r"\s{2,}")
+# ASCII text without any of these is already clean apart from the final strip of dots/spaces
+_DIRTY_ASCII_RE = re.compile(r'[\x00-\x1f<>:"|?*/\\]|  |^ | $')
+# Pattern placeholders; patterns are parsed once by compile_pattern
+_PLACEHOLDER_RE = re.compile(r"%[ALSYGBIEeaTU]")
+
 
 def sanitize_component(s: str) -> str:
     """
@@ -51,25 +90,26 @@ def sanitize_component(s: str) -> str:
     """
     if s is None:
         s = ""
-    s = str(s)
-    s = unicodedata.normalize("NFKC", s)
+    return _sanitize_text(str(s))
 
-    # Replace path separators explicitly
-    s = s.replace("/", "-").replace("\\", "-")
 
-    # Replace reserved/unsafe and control characters using explicit per-char check
-    out_chars = []
-    for ch in s:
-        code = ord(ch)
-        if code < 32 or ch in '<>:"|?*':
-            out_chars.append("-")
-        else:
-            out_chars.append(ch)
-    s = "".join(out_chars)
+@lru_cache(maxsize=8192)
+def _sanitize_text(s: str) -> str:
+    """
+    Cached body of sanitize_component. Libraries repeat the same artist/album/genre values
+    across many files; JSON values are coerced to str first so unhashable ones never reach the cache.
+    """
+    # Fast path: typical metadata is clean ASCII, which NFKC, translate and whitespace collapsing leave unchanged
+    if s.isascii() and not _DIRTY_ASCII_RE.search(s):
+        return s.strip(" .") or "Unknown"
+
+    s = unicodedata.normalize("NFKC", s)
+
+    # Replace path separators, reserved/unsafe and control characters in one pass
+    s = s.translate(_SANITIZE_TABLE)
 
     # Collapse whitespace and trim problematic trailing chars
-    # NOTE: Fixes previous bug: pattern must be r"\s+" not "\\s+"
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WS_RE.sub(" ", s).strip()
     s = s.strip(" .")
 
     if not s:
@@ -87,64 +127,456 @@ def is_unknown_text(text: str) -> bool:
     """
     if text is None:
         return True
-    t = str(text).strip().lower()
-    return t == "unknown" or t.startswith("unknown ")
+    return _is_unknown_str(str(text))
+
+
+@lru_cache(maxsize=1024)
+def _is_unknown_str(s: str) -> bool:
+    # Only the first 8 characters decide, so lower-case just those instead of the whole value;
+    # cached because the same artist/album values repeat across a library
+    t = s.strip()
+    head = t[:8].lower()
+    return head == "unknown " or (head == "unknown" and len(t) == 7)
+
+
+class SourceItem(NamedTuple):
+    """An existing source file grouped under its rendered destination."""
+    src: str
+    src_abs: str
+    size: int
+    dest_rel_base: str
+
+
+class PlannedOp(NamedTuple):
+    """A COPY or MOVE planned for --apply (tuples carry no per-instance dict)."""
+    action: str
+    src: str
+    dest_abs: str
+    dest_rel: str
+    size: int
+
+
+def abspath_from(path: str, cwd: str) -> str:
+    """os.path.abspath against a working directory fetched once, instead of one getcwd per call."""
+    return os.path.normpath(path if os.path.isabs(path) else os.path.join(cwd, path))
 
 
 def load_mapping(path: str) -> Dict[str, dict]:
-    """Load the recognized-songs mapping from JSON file."""
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Load the recognized-songs mapping from JSON file (with orjson when installed)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def available_hash_algorithm(name: str) -> bool:
+    """Return True if the hash algorithm can be used with the installed packages."""
+    if name == "blake3":
+        return blake3 is not None
+    if name == "xxh3":
+        return xxhash is not None
+    return name == "sha256"
+
+
+def resolve_hash_algorithm(name: str) -> str:
+    """Map 'auto' to the fastest installed algorithm; other names are returned unchanged."""
+    if name != "auto":
+        return name
+    return next(a for a in HASH_ALGORITHMS if available_hash_algorithm(a))
+
 
+def new_hasher(algorithm: str):
+    """Return a fresh hash object for the given algorithm name."""
+    if algorithm == "blake3":
+        return blake3.blake3()
+    if algorithm == "xxh3":
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
 
-def compute_file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
-    """Return SHA-256 hex digest of a file's content."""
-    h = hashlib.sha256()
+
+# Files larger than this are hashed in chunks to cap address-space use on 32-bit systems
+_MMAP_HASH_LIMIT = 2 * 1024 * 1024 * 1024
+
+
+def compute_file_hash(path: str, chunk_size: int = 1024 * 1024, algorithm: str = "sha256") -> str:
+    """
+    Return the hex digest of a file's content (SHA-256 unless another algorithm is given).
+    The file is memory-mapped and hashed in a single call; empty and very large files
+    use a chunked read loop instead.
+    """
+    h = new_hasher(algorithm)
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if 0 < size <= _MMAP_HASH_LIMIT:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        else:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
     return h.hexdigest()
 
 
-def add_suffix_to_filename(path: str, n: int) -> str:
+def try_file_hash(path: str, algorithm: str = "sha256") -> Optional[str]:
+    """Return the content hash of path, or None if it cannot be read."""
+    try:
+        return compute_file_hash(path, algorithm=algorithm)
+    except Exception:
+        return None
+
+
+# Bytes read from each end of a file for the quick fingerprint
+_QUICK_SPAN = 64 * 1024
+
+
+def compute_quick_fingerprint(path: str, size: int, span: int = _QUICK_SPAN) -> str:
+    """
+    Return a cheap fingerprint of the first and last span bytes of a file (xxh3-64 when
+    installed, BLAKE2b otherwise). Files whose fingerprints differ cannot be identical, so
+    only files with matching fingerprints need a full content hash.
     """
-    Add "_n" suffix to the filename (before extension) if n > 1, otherwise return as-is.
+    h = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(span))
+        f.seek(max(0, size - span))
+        h.update(f.read(span))
+    return h.hexdigest()
 
-    Example:
-      path=".../Song.mp3", n=1 -> ".../Song.mp3"
-      path=".../Song.mp3", n=2 -> ".../Song_2.mp3"
+
+def try_quick_fingerprint(item: Tuple[str, int]) -> Optional[str]:
+    """Return the quick fingerprint of a (path, size) pair, or None if it cannot be read."""
+    try:
+        return compute_quick_fingerprint(*item)
+    except Exception:
+        return None
+
+
+def try_files_equal(pair: Tuple[str, str]) -> bool:
+    """Return True if both files have identical bytes; False if they differ or cannot be read."""
+    try:
+        return filecmp.cmp(pair[0], pair[1], shallow=False)
+    except OSError:
+        return False
+
+
+def map_parallel(func: Callable, items: list, workers: Optional[int] = None) -> list:
+    """
+    Apply func to items in a thread pool, keeping order. Reads overlap across files and
+    hashlib releases the GIL while digesting, so hashing uses several cores.
     """
-    if n <= 1:
-        return path
-    d = os.path.dirname(path)
-    base = os.path.basename(path)
-    stem, ext = os.path.splitext(base)
-    return os.path.join(d, f"{stem}_{n}{ext}")
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or os.cpu_count() or 1, len(items)))) as pool:
+        return list(pool.map(func, items))
+
+
+def hash_files_parallel(
+    paths: List[str], workers: Optional[int] = None, algorithm: str = "sha256"
+) -> Dict[str, Optional[str]]:
+    """Hash many files concurrently. Unreadable files map to None."""
+    return dict(zip(paths, map_parallel(partial(try_file_hash, algorithm=algorithm), paths, workers)))
+
+
+def open_hash_cache(path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the SQLite cache of file content hashes."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS hashes ("
+        "path TEXT NOT NULL, algorithm TEXT NOT NULL, size INTEGER NOT NULL, "
+        "mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL, PRIMARY KEY (path, algorithm))"
+    )
+    return conn
 
 
-def compute_unique_destination(base_dest: str, start_n: int = 1) -> Tuple[str, int]:
+def hash_files_cached(
+    conn: sqlite3.Connection,
+    paths: List[str],
+    stats: Dict[str, Tuple[int, int]],
+    algorithm: str = "sha256",
+) -> Dict[str, Optional[str]]:
+    """
+    Like hash_files_parallel, but reuse digests stored in the cache while a file's size and
+    mtime are unchanged. stats maps each path to its (size, mtime_ns) from the planning stat,
+    so no file is stat'ed twice. New digests are written back in one transaction at the end.
     """
-    Compute a unique destination path. If base_dest exists, increment the suffix
-    (_n) until a non-existing filename is found.
+    hashes: Dict[str, Optional[str]] = {}
+    misses = []  # (path, abs path, size, mtime_ns)
+    cwd = os.getcwd()
+    for p in paths:
+        size, mtime_ns = stats[p]
+        p_abs = abspath_from(p, cwd)
+        row = conn.execute(
+            "SELECT digest FROM hashes WHERE path = ? AND algorithm = ? AND size = ? AND mtime_ns = ?",
+            (p_abs, algorithm, size, mtime_ns),
+        ).fetchone()
+        if row is not None:
+            hashes[p] = row[0]
+        else:
+            misses.append((p, p_abs, size, mtime_ns))
+
+    computed = hash_files_parallel([m[0] for m in misses], algorithm=algorithm)
+    hashes.update(computed)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO hashes (path, algorithm, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+            [(p_abs, algorithm, size, mtime_ns, computed[p])
+             for p, p_abs, size, mtime_ns in misses if computed[p] is not None],
+        )
+    return hashes
+
+
+def list_dir_names(d: str) -> Tuple[Set[str], Optional[Set[str]]]:
+    """
+    Return (names, lower-cased names) present in directory d.
+
+    A missing directory, or a file where the directory would be, yields empty sets (nothing
+    can exist below it). If d cannot be listed for another reason (e.g. permission denied),
+    the lower-cased set is None: callers then check each candidate with os.path.exists.
+    """
+    try:
+        with os.scandir(d or ".") as it:
+            names = {e.name for e in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set(), set()
+    except OSError:
+        return set(), None
+    return names, {name.lower() for name in names}
+
+
+def compute_unique_destination(
+    base_dest: str, start_n: int = 1, dir_cache: Optional[Dict[str, Tuple[Set[str], Optional[Set[str]]]]] = None
+) -> Tuple[str, int]:
+    """
+    Compute a unique destination path. If base_dest exists, add a "_n" suffix to the
+    filename (before extension) and increment n until a non-existing filename is found.
+
+    Example:
+      ".../Song.mp3" exists -> ".../Song_2.mp3"
+
+    With dir_cache (directory -> list_dir_names result), each destination directory is
+    listed once and candidates are checked in memory. Names are compared exactly; a name
+    that only differs in case falls back to os.path.exists, so the result matches the
+    uncached lookup on both case-sensitive and case-insensitive filesystems. A directory
+    that cannot be listed falls back to os.path.exists for every candidate. The chosen
+    name is recorded so later calls in the same run never pick it again.
 
     Returns:
       (unique_dest_path, final_n)
     """
     n = max(1, start_n)
-    candidate = add_suffix_to_filename(base_dest, n)
-    while os.path.exists(candidate):
+    # Split once; suffixed candidates are then built by plain string concatenation
+    root, ext = os.path.splitext(base_dest)
+    candidate = base_dest if n <= 1 else f"{root}_{n}{ext}"
+    if dir_cache is None:
+        while os.path.exists(candidate):
+            n += 1
+            candidate = f"{root}_{n}{ext}"
+        return candidate, n
+
+    d = os.path.dirname(base_dest)
+    cached = dir_cache.get(d)
+    if cached is None:
+        cached = dir_cache[d] = list_dir_names(d)
+    names, folded = cached
+
+    def taken(path: str) -> bool:
+        name = os.path.basename(path)
+        return name in names or ((folded is None or name.lower() in folded) and os.path.exists(path))
+
+    while taken(candidate):
         n += 1
-        candidate = add_suffix_to_filename(base_dest, n)
+        candidate = f"{root}_{n}{ext}"
+    name = os.path.basename(candidate)
+    names.add(name)
+    if folded is not None:
+        folded.add(name.lower())
     return candidate, n
 
 
-def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: str, keep_unknowns: bool = False) -> str:
+def stat_paths(paths: List[str]) -> List[Tuple[int, int]]:
+    """
+    Return (size, mtime_ns) for each path from a single stat call, or (-1, 0) where it
+    cannot be stat'ed (missing/unreadable).
+    """
+    stats = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            stats.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            stats.append((-1, 0))
+    return stats
+
+
+def stat_sources_parallel(paths: List[str], workers: int = 32, batch: int = 256) -> Dict[str, Tuple[int, int]]:
+    """
+    Stat many source files concurrently. On network filesystems each stat is a round trip,
+    so overlapping them in a thread pool hides the latency; paths are handed to workers
+    in batches to keep per-task overhead low on fast local disks.
     """
-    Render the destination relative path (including extension) from a pattern.
+    batches = [paths[i:i + batch] for i in range(0, len(paths), batch)]
+    stats: Dict[str, Tuple[int, int]] = {}
+    if not batches:
+        return stats
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        for chunk, chunk_stats in zip(batches, pool.map(stat_paths, batches)):
+            stats.update(zip(chunk, chunk_stats))
+    return stats
+
+
+# errno values meaning an in-kernel copy is unsupported for this pair of files
+_COPY_UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL)
+
+
+def _copy_range_loop(src_fd: int, dst_fd: int) -> None:
+    """Copy with os.copy_file_range (may reflink on btrfs/xfs) until EOF."""
+    while os.copy_file_range(src_fd, dst_fd, 1 << 30):
+        pass
+
+
+def _sendfile_loop(src_fd: int, dst_fd: int) -> None:
+    """Copy with os.sendfile from offset 0 until EOF, rewinding a partial earlier attempt."""
+    os.ftruncate(dst_fd, 0)
+    os.lseek(dst_fd, 0, os.SEEK_SET)
+    offset = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset, 1 << 30)
+        if not sent:
+            break
+        offset += sent
+
+
+def copy_file_fast(src: str, dst: str) -> None:
+    """
+    Copy file content and metadata (like shutil.copy2).
+    Keeps bytes in the kernel: os.copy_file_range where available, then os.sendfile on Linux
+    (e.g. older kernels without cross-filesystem copy_file_range); falls back to
+    shutil.copyfile when neither applies.
+    """
+    strategies = []
+    if hasattr(os, "copy_file_range"):
+        strategies.append(_copy_range_loop)
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        # Only Linux accepts a regular file as the sendfile destination
+        strategies.append(_sendfile_loop)
+    copied = False
+    if strategies:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            for strategy in strategies:
+                try:
+                    strategy(src_fd, dst_fd)
+                    copied = True
+                    break
+                except OSError as e:
+                    if e.errno not in _COPY_UNSUPPORTED:
+                        raise
+    if not copied:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+
+def copy_to_destination(src: str, dest_abs: str) -> None:
+    """
+    Copy src to dest_abs through a temp file and atomic rename to avoid partial writes.
+    Never overwrites an existing file by design (dest_abs is unique).
+    """
+    temp_path = dest_abs + ".incoming"
+    if os.path.exists(temp_path):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    copy_file_fast(src, temp_path)
+    os.replace(temp_path, dest_abs)
+
+
+def dumps_indented(obj) -> str:
+    """Serialize obj as JSON with 2-space indentation and raw UTF-8 text (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def write_report_json(f, header: dict, list_key: str, items) -> None:
+    """
+    Write header plus a final list_key array to f, serializing the items one at a time.
+    The output matches json.dump(..., indent=2, ensure_ascii=False) of the header
+    with the list appended, without building the list in memory.
+    """
+    # Reopen the header object (drop the closing "\n}") and start the array
+    head = dumps_indented(header)[:-2] + "," if header else "{"
+    f.write(head + f"\n  {json.dumps(list_key)}: [")
+    empty = True
+    for item in items:
+        f.write(("\n    " if empty else ",\n    ") + dumps_indented(item).replace("\n", "\n    "))
+        empty = False
+    f.write("]\n}" if empty else "\n  ]\n}")
+
+
+def apply_op(op: PlannedOp) -> None:
+    """Perform one planned COPY or MOVE operation (destination directory must exist)."""
+    if op.action == "MOVE":
+        # Move is simpler; rename across filesystems handled by shutil.move
+        shutil.move(op.src, op.dest_abs)
+    else:
+        copy_to_destination(op.src, op.dest_abs)
+
+
+def pattern_placeholders(pattern: str) -> Set[str]:
+    """Return the set of placeholders (e.g. {'%A', '%S'}) used by a pattern."""
+    return set(_PLACEHOLDER_RE.findall(pattern))
+
+
+def compile_pattern(pattern: str) -> Callable[[Dict[str, str]], List[str]]:
+    """
+    Parse a pattern once, per "/"-separated component, into literal chunks and placeholders
+    and return a renderer that builds the path components for a replacements mapping.
+    Placeholders missing from the mapping stay literal; components without placeholders are
+    rendered once up front. Replacement values are sanitized components, so they cannot add
+    separators and the rendered path never needs splitting again.
+
+    Example:
+      compile_pattern("%A/%S")({"%A": "Artist", "%S": "Song"}) -> ["Artist", "Song"]
+    """
+    # Each component is either a constant string or a list of (text, is_placeholder) tokens
+    components: List[Union[str, List[Tuple[str, bool]]]] = []
+    for part in pattern.split("/"):
+        tokens: List[Tuple[str, bool]] = []
+        pos = 0
+        for m in _PLACEHOLDER_RE.finditer(part):
+            if m.start() > pos:
+                tokens.append((part[pos:m.start()], False))
+            tokens.append((m.group(0), True))
+            pos = m.end()
+        if pos < len(part):
+            tokens.append((part[pos:], False))
+        components.append(tokens if any(is_placeholder for _, is_placeholder in tokens) else part)
+
+    def render(replacements: Dict[str, str]) -> List[str]:
+        return [
+            c if isinstance(c, str)
+            else "".join([replacements.get(t, t) if is_placeholder else t for t, is_placeholder in c])
+            for c in components
+        ]
+
+    return render
+
+
+def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: Union[str, Callable[[Dict[str, str]], List[str]]], keep_unknowns: bool = False) -> str:
+    """
+    Render the destination relative path (including extension) from a pattern
+    (a pattern string, or a renderer returned by compile_pattern).
 
     Behavior:
     - Replaces placeholders using the provided replacements mapping (e.g., %A, %L, %S, %Y, %G, %B, %I, %E, %e, %a, %T, %U)
-    - Splits on "/" to form directories
+    - Uses the "/"-separated pattern components as directories
     - Sanitizes each path component
     - Unless keep_unknowns is True, drops components that are 'Unknown' or 'Unknown ...'
       and trims dangling punctuation around removed values
@@ -158,11 +590,8 @@ def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: str, ke
             for k, v in replacements.items()
         }
 
-    sub = pattern
-    for k, v in replacements.items():
-        sub = sub.replace(k, v)
-
-    parts = [p for p in sub.split("/") if p not in ("", ".", "..")]
+    render = pattern if callable(pattern) else compile_pattern(pattern)
+    parts = [p for p in render(replacements) if p not in ("", ".", "..")]
 
     safe_parts: List[str] = []
     for p in parts:
@@ -172,8 +601,8 @@ def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: str, ke
             continue
         if not keep_unknowns:
             # Trim dangling punctuation/hyphens introduced by removed unknowns
-            comp = re.sub(r"^[\s\-_.(),;:]+|[\s\-_.(),;:]+$", "", comp)
-            comp = re.sub(r"\s{2,}", " ", comp).strip()
+            comp = _TRIM_RE.sub("", comp)
+            comp = _MULTISPACE_RE.sub(" ", comp).strip()
         if comp:
             safe_parts.append(comp)
 
@@ -185,7 +614,7 @@ def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: str, ke
             if not keep_unknowns and is_unknown_text(v):
                 v = ""
             if not keep_unknowns:
-                v = re.sub(r"^[\s\-_.(),;:]+|[\s\-_.(),;:]+$", "", v).strip()
+                v = _TRIM_RE.sub("", v).strip()
             if v:
                 core.append(v)
         if not core:
@@ -201,7 +630,8 @@ def build_dest_rel_base(replacements: Dict[str, str], ext: str, pattern: str, ke
     return path_no_ext + ext
 
 
-def main():
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the CLI with argv (defaults to sys.argv[1:]) and return the exit code."""
     parser = argparse.ArgumentParser(
         description=(
             "Organize recognized music files according to a path pattern using placeholders: "
@@ -249,7 +679,8 @@ def main():
     parser.add_argument(
         "--duplicates-json",
         default="duplicates.json",
-        help="Path to write duplicates report JSON (default: duplicates.json)."
+        help="Path to write duplicates report JSON (default: duplicates.json). "
+             "Use '-' to write it to stdout; the summary and other messages then go to stderr."
     )
     parser.add_argument(
         "--keep-unknowns",
@@ -261,38 +692,91 @@ def main():
         default="_duplicate_",
         help="Token inserted between base name and original source basename for duplicates (sanitized for filesystem safety). Default: '_duplicate_'."
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        help="Number of files copied in parallel with --apply (default: 4). Use 1 to apply serially. "
+             "Moves always run one at a time; after the first failed operation no further ones are started."
+    )
+    parser.add_argument(
+        "--hash",
+        choices=("auto",) + HASH_ALGORITHMS,
+        default="auto",
+        help="Content hash used to detect identical files: blake3 or xxh3 (optional packages) or sha256. "
+             "Default 'auto' picks the fastest one installed."
+    )
+    parser.add_argument(
+        "--hash-cache",
+        metavar="PATH",
+        help="SQLite file caching content hashes between runs, keyed by path, size and modification time. "
+             "Unchanged files are not re-read. Disabled unless given."
+    )
+    args = parser.parse_args(argv)
+
+    if args.duplicates_json == "-":
+        # The report takes stdout, so human-readable output moves to stderr and the two never mix
+        report_stream = sys.stdout
+        with redirect_stdout(sys.stderr):
+            return organize(args, report_stream)
+    return organize(args)
+
+
+def organize(args: argparse.Namespace, report_stream: Optional[TextIO] = None) -> int:
+    """Plan (and with --apply perform) the operations for parsed CLI args; returns the exit code.
+    When report_stream is given the duplicates report is written there instead of to args.duplicates_json."""
+    hash_algorithm = resolve_hash_algorithm(args.hash)
+    if not available_hash_algorithm(hash_algorithm):
+        package = "xxhash" if hash_algorithm == "xxh3" else hash_algorithm
+        print(f"ERROR: --hash {hash_algorithm} requires the '{package}' package (pip install {package}).", file=sys.stderr)
+        return 1
 
     # Load mapping
     try:
         mapping = load_mapping(args.input)
     except FileNotFoundError:
         print(f"ERROR: Input file not found: {args.input}", file=sys.stderr)
-        sys.exit(1)
+        return 1
     except json.JSONDecodeError as e:
         print(f"ERROR: Failed to parse JSON: {e}", file=sys.stderr)
-        sys.exit(1)
+        return 1
 
     if not isinstance(mapping, dict):
         print(
             "ERROR: Mapping must be a JSON object mapping absolute paths to metadata.",
             file=sys.stderr,
         )
-        sys.exit(1)
+        return 1
 
-    # Destination root (defaults to current directory '.')
+    # Destination root (defaults to current directory '.'); the working directory is fetched
+    # once and reused for every absolute path built below
+    cwd = os.getcwd()
     dest_root = args.dest_root
+    dest_root_abs = abspath_from(dest_root, cwd)
     if args.verbose:
-        print(f"Destination root: {os.path.abspath(dest_root)}")
+        print(f"Destination root: {dest_root_abs}")
         print(f"Pattern: {args.pattern}")
         print("Mode:", "MOVE" if args.move else "COPY")
         print("Apply:", "YES" if args.apply else "NO (dry-run)")
         print("Keep unknowns:", "YES" if args.keep_unknowns else "NO")
-
-    sources = list(mapping.keys())
-
-    # Group entries by destination relative path (case-insensitive)
-    groups: Dict[str, List[dict]] = defaultdict(list)
+        print(f"Hash: {hash_algorithm}")
+
+    # Skip non-dict entries and non-path keys like "$schema"
+    sources = [
+        src for src, meta in mapping.items()
+        if isinstance(meta, dict) and not (isinstance(src, str) and src.startswith("$"))
+    ]
+    source_stats = stat_sources_parallel(sources)
+
+    # Parse the pattern once; each entry then renders it by concatenation
+    render_pattern = compile_pattern(args.pattern)
+    optional_used = [k for k in ("%Y", "%G", "%B", "%I", "%a", "%T", "%U") if k in pattern_placeholders(args.pattern)]
+
+    # Group existing sources by destination relative path (case-insensitive). Items are compact
+    # SourceItem tuples; missing sources are only counted per destination.
+    groups: Dict[str, List[SourceItem]] = defaultdict(list)
+    group_sizes: Dict[str, int] = defaultdict(int)
     missing_sources: List[str] = []
     total_entries = 0
 
@@ -335,55 +819,45 @@ def main():
         applemusic_track_id = meta.get("applemusic_track_id")
         applemusic_album_id = meta.get("applemusic_album_id")
 
-        artist_id_s = sanitize_component(artist_adamid or "Unknown")
-        year_s = sanitize_component(str(release_year) if release_year is not None else "Unknown")
-        genre_s = sanitize_component(genre_primary or "Unknown")
-        label_s = sanitize_component(label or "Unknown")
-        isrc_s = sanitize_component(isrc or "Unknown")
         explicit_str = "Explicit" if explicit_bool else "Clean"
         explicit_raw = "true" if explicit_bool else "false"
-        am_track_s = sanitize_component(applemusic_track_id or "Unknown")
-        am_album_s = sanitize_component(applemusic_album_id or "Unknown")
+        optional_values = {
+            "%Y": str(release_year) if release_year is not None else "Unknown",
+            "%G": genre_primary or "Unknown",
+            "%B": label or "Unknown",
+            "%I": isrc or "Unknown",
+            "%a": artist_adamid or "Unknown",
+            "%T": applemusic_track_id or "Unknown",
+            "%U": applemusic_album_id or "Unknown",
+        }
 
         replacements = {
             "%A": author_s,
             "%L": album_s,
             "%S": song_s,
-            "%Y": year_s,
-            "%G": genre_s,
-            "%B": label_s,
-            "%I": isrc_s,
             "%E": explicit_str,
             "%e": explicit_raw,
-            "%a": artist_id_s,
-            "%T": am_track_s,
-            "%U": am_album_s,
         }
+        # Only sanitize the optional placeholders the pattern actually uses
+        for k in optional_used:
+            replacements[k] = sanitize_component(optional_values[k])
 
-        # Build destination relative base path (including extension) from pattern
-        dest_rel_base = build_dest_rel_base(replacements, ext, args.pattern, args.keep_unknowns)
+        # Build destination relative base path (including extension) with the precompiled pattern
+        dest_rel_base = build_dest_rel_base(replacements, ext, render_pattern, args.keep_unknowns)
 
         # Deduplicate case-insensitively on the final destination path
         key = dest_rel_base.lower()
 
-        try:
-            size = os.path.getsize(src)
-        except OSError:
-            size = -1
-            missing_sources.append(src)
+        group_sizes[key] += 1
 
+        # Sizes (and mtimes, for the hash cache) come from the parallel stat pass; the absolute source path is computed once
+        # and reused for the in-place check
+        size = source_stats[src][0]
+        if size < 0:
+            missing_sources.append(src)
+            continue
 
-        groups[key].append(
-            {
-                "src": src,
-                "size": size,
-                "author_s": author_s,
-                "album_s": album_s,
-                "song_s": song_s,
-                "ext": ext,
-                "dest_rel_base": dest_rel_base,
-            }
-        )
+        groups[key].append(SourceItem(src, abspath_from(src, cwd), size, dest_rel_base))
 
     # Plan operations:
     # - Skip identical duplicates (bit-for-bit).
@@ -391,8 +865,14 @@ def main():
     #     First occurrence: Song.ext
     #     Subsequent occurrences: Song_<OriginalSourceBasename>.ext
     #     Only if that conflicts, add numeric suffix: Song_<Original>_2.ext, etc.
-    ops = []  # planned operations for valid (non-missing) sources
-    duplicates_report = {}  # key -> list of (src, assigned_rel) or (src, None, "skipped-identical")
+    ops: List[PlannedOp] = []  # planned operations for valid (non-missing) sources
+    safe_token = sanitize_component(args.duplicate_token)
+    dir_cache: Dict[str, Tuple[Set[str], Optional[Set[str]]]] = {}  # destination dir -> names present or already planned
+    # lower-cased candidate path -> last suffix number chosen for it; every smaller number is
+    # already taken, so the next probe for the same candidate starts right after it
+    reserved_stems: Dict[str, int] = {}
+    # key -> list of (src, assigned_rel); assigned_rel is None for skipped identical duplicates
+    duplicates_report: Dict[str, List[Tuple[str, Optional[str]]]] = defaultdict(list)
     duplicate_groups = 0
     total_duplicates_kept = 0
     identical_duplicates_skipped = 0
@@ -401,27 +881,84 @@ def main():
     planned_copies = 0
     planned_moves = 0
 
+    # Only files that could be bit-identical to another need a hash: a file alone in its group,
+    # or whose size no other file in the group shares, is unique without reading it.
+    # Larger same-size files are first compared by a quick head/tail fingerprint; only those
+    # whose fingerprint also matches are hashed in full. When exactly two files remain, a direct
+    # byte comparison replaces both hashes (more than two would need pairwise compares).
+    # All passes run in a thread pool.
+    candidates: List[List[str]] = []  # sources that may be identical to each other
+    quick_buckets = []  # (src, size) lists sharing a size within one group
+    for items in groups.values():
+        if len(items) > 1:
+            by_size: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+            for src, _, size, _ in items:
+                by_size[size].append((src, size))
+            for size, bucket in by_size.items():
+                if len(bucket) < 2:
+                    continue
+                if size <= 2 * _QUICK_SPAN:
+                    # The fingerprint would read the whole file anyway
+                    candidates.append([src for src, _ in bucket])
+                else:
+                    quick_buckets.append(bucket)
+    quick_items = [item for bucket in quick_buckets for item in bucket]
+    quick_fps = dict(zip((src for src, _ in quick_items), map_parallel(try_quick_fingerprint, quick_items)))
+    for bucket in quick_buckets:
+        by_fp: Dict[Optional[str], List[str]] = defaultdict(list)
+        for src, _ in bucket:
+            by_fp[quick_fps[src]].append(src)
+        for fp, srcs in by_fp.items():
+            # Unreadable files (None) get no digest and are treated as unique
+            if fp is not None and len(srcs) > 1:
+                candidates.append(srcs)
+    # The hash cache is only useful if every candidate is hashed, so pairs are compared
+    # directly only without it
+    to_hash = []
+    to_compare: List[Tuple[str, str]] = []
+    for srcs in candidates:
+        if len(srcs) == 2 and not args.hash_cache:
+            to_compare.append((srcs[0], srcs[1]))
+        else:
+            to_hash.extend(srcs)
+    file_hashes = None
+    if args.hash_cache:
+        try:
+            conn = open_hash_cache(args.hash_cache)
+            try:
+                file_hashes = hash_files_cached(conn, to_hash, source_stats, algorithm=hash_algorithm)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"WARNING: Hash cache unavailable ({e}); hashing without it.", file=sys.stderr)
+    if file_hashes is None:
+        file_hashes = hash_files_parallel(to_hash, algorithm=hash_algorithm)
+    # Identical pairs share a marker in place of a digest; differing pairs stay unhashed (unique)
+    for (a, b), same in zip(to_compare, map_parallel(try_files_equal, to_compare)):
+        if same:
+            file_hashes[a] = file_hashes[b] = "same-as:" + a
+
+    # The action is the same for every op
+    action = "MOVE" if args.move else "COPY"
+
     for key, items in groups.items():
         # Any group with more than one valid entry is a duplicates group
-        # But we only count duplicates among files that actually exist
-        valid_items = [i for i in items if i["size"] >= 0]
-        if len(valid_items) > 1:
+        # (groups only hold files that actually exist)
+        if len(items) > 1:
             duplicate_groups += 1
 
         seen_hashes = set()
         unique_count = 0
 
-        for it in valid_items:
-            # Compute content hash to detect identical files
-            try:
-                h = compute_file_hash(it["src"])
-            except Exception:
-                h = None  # Treat unreadable as unique to avoid accidental drops
+        for src, src_abs, size, base_rel in items:
+            # Content hash to detect identical files (None if not needed or unreadable:
+            # treated as unique to avoid accidental drops)
+            h = file_hashes.get(src)
 
             if h is not None and h in seen_hashes:
                 identical_duplicates_skipped += 1
-                if len(valid_items) > 1:
-                    duplicates_report.setdefault(key, []).append((it["src"], None, "skipped-identical"))
+                if len(items) > 1:
+                    duplicates_report[key].append((src, None))
                 continue
 
             if h is not None:
@@ -429,108 +966,99 @@ def main():
 
             unique_count += 1
 
-            base_rel = it["dest_rel_base"]
-            dest_abs_base = os.path.join(dest_root, base_rel)
-
-            # Build candidate name:
+            # Build candidate relative name:
             # - First unique keeps base name
-            # - Subsequent uniques keep original source basename after "_"
+            # - Subsequent uniques keep original source basename after the duplicate token
             if unique_count == 1:
-                candidate = dest_abs_base
+                candidate_rel = base_rel
             else:
-                d = os.path.dirname(dest_abs_base)
-                base_name = os.path.basename(dest_abs_base)
-                stem, ext = os.path.splitext(base_name)
-                src_stem = sanitize_component(os.path.splitext(os.path.basename(it["src"]))[0])
-                safe_token = sanitize_component(args.duplicate_token)
-                candidate = os.path.join(d, f"{stem}{safe_token}{src_stem}{ext}")
+                stem, ext = os.path.splitext(base_rel)
+                src_stem = sanitize_component(os.path.splitext(os.path.basename(src))[0])
+                candidate_rel = f"{stem}{safe_token}{src_stem}{ext}"
 
             # Ensure uniqueness against filesystem using numeric suffix only if needed
-            unique_abs, final_n = compute_unique_destination(candidate, 1)
-            # Rebuild relative path from final unique abs to keep reporting tidy
-            unique_rel = os.path.relpath(unique_abs, dest_root)
+            candidate_abs = os.path.join(dest_root_abs, candidate_rel)
+            stem_key = candidate_abs.lower()
+            unique_abs, final_n = compute_unique_destination(candidate_abs, reserved_stems.get(stem_key, 0) + 1, dir_cache)
+            reserved_stems[stem_key] = final_n
+            # Derive the relative path the same way the suffix was added, instead of relpath()
+            if final_n > 1:
+                stem, ext = os.path.splitext(candidate_rel)
+                unique_rel = f"{stem}_{final_n}{ext}"
+            else:
+                unique_rel = candidate_rel
 
             # Track duplicates report (list all in the group if group size > 1)
-            if len(valid_items) > 1:
-                duplicates_report.setdefault(key, []).append((it["src"], unique_rel))
+            if len(items) > 1:
+                duplicates_report[key].append((src, unique_rel))
 
             # Plan operation (skip no-op if source already equals destination)
-            try:
-                src_abs = os.path.abspath(it["src"])
-                dest_abs = os.path.abspath(unique_abs)
-            except Exception:
-                src_abs = it["src"]
-                dest_abs = unique_abs
-
-            if src_abs == dest_abs:
+            if src_abs == unique_abs:
                 already_in_place += 1
                 if args.verbose:
-                    print(f"SKIP already in place: {it['src']}")
+                    print(f"SKIP already in place: {src}")
                 continue
 
-            action = "MOVE" if args.move else "COPY"
             if action == "MOVE":
                 planned_moves += 1
             else:
                 planned_copies += 1
 
-            ops.append(
-                {
-                    "action": action,
-                    "src": it["src"],
-                    "dest_abs": unique_abs,
-                    "dest_rel": unique_rel,
-                    "size": it["size"],
-                }
-            )
+            ops.append(PlannedOp(action, src, unique_abs, unique_rel, size))
 
         # Track how many distinct duplicates are kept for this group
-        if len(valid_items) > 1 and unique_count > 1:
+        if len(items) > 1 and unique_count > 1:
             total_duplicates_kept += unique_count - 1
 
     # Apply operations if requested
     copies_performed = 0
     moves_performed = 0
+    apply_failures: List[Tuple[PlannedOp, Exception]] = []
+    ops_not_attempted = 0
 
     if args.apply:
-        for op in ops:
-            src = op["src"]
-            dest_abs = op["dest_abs"]
-            dest_dir = os.path.dirname(dest_abs)
-
-            # Ensure destination directory exists
+        # Create each destination directory once, parents first, instead of once per file
+        for dest_dir in sorted({os.path.dirname(op.dest_abs) for op in ops}, key=len):
             os.makedirs(dest_dir, exist_ok=True)
 
-            if op["action"] == "MOVE":
-                # Move is simpler; rename across filesystems handled by shutil.move
-                shutil.move(src, dest_abs)
-                moves_performed += 1
-                if args.verbose:
-                    print(f"MOVE {src} -> {dest_abs}")
-            else:
-                # COPY: copy2 to preserve metadata; never overwrite (dest is unique)
-                # Use a temp file then atomic rename to avoid partial writes
-                temp_path = dest_abs + ".incoming"
-                if os.path.exists(temp_path):
+        # Copies are I/O-bound, so up to --jobs of them overlap in a thread pool; moves run one
+        # at a time. Ops finish in plan order, and nothing new is started after the first
+        # failure, so a failing MOVE leaves the rest of the library where it was.
+        if ops:
+            workers = 1 if args.move else max(1, args.jobs)
+            pending: Deque[Tuple[PlannedOp, "Future[None]"]] = deque()
+            op_iter = iter(ops)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while True:
+                    while not apply_failures and len(pending) < workers:
+                        op = next(op_iter, None)
+                        if op is None:
+                            break
+                        pending.append((op, pool.submit(apply_op, op)))
+                    if not pending:
+                        break
+                    op, future = pending.popleft()
                     try:
-                        os.remove(temp_path)
-                    except OSError:
-                        pass
-                shutil.copy2(src, temp_path)
-                os.replace(temp_path, dest_abs)
-                copies_performed += 1
-                if args.verbose:
-                    print(f"COPY {src} -> {dest_abs}")
+                        future.result()
+                    except (OSError, shutil.Error) as e:
+                        apply_failures.append((op, e))
+                        continue
+                    if op.action == "MOVE":
+                        moves_performed += 1
+                    else:
+                        copies_performed += 1
+                    if args.verbose:
+                        print(f"{op.action} {op.src} -> {op.dest_abs}")
+            ops_not_attempted = len(ops) - copies_performed - moves_performed - len(apply_failures)
     else:
-        # Dry run verbose output
-        if args.verbose:
-            for op in ops:
-                print(f"PLAN {op['action']} {op['src']} -> {op['dest_abs']}")
+        # Dry run verbose output, written in one call instead of one print per op
+        if args.verbose and ops:
+            sys.stdout.write("".join(f"PLAN {op.action} {op.src} -> {op.dest_abs}\n" for op in ops))
 
     # Summary
     print("Summary:")
     print(f"  Total JSON entries:     {total_entries}")
-    print(f"  Unique destinations:    {len(groups)}")
+    print(f"  Unique destinations:    {len(group_sizes)}")
     print(f"  Missing source files:   {len(missing_sources)}")
     print(f"  Already in place:       {already_in_place}")
     print(f"  Duplicate groups:       {duplicate_groups}")
@@ -541,6 +1069,9 @@ def main():
     if args.apply:
         print(f"  Copied:                 {copies_performed}")
         print(f"  Moved:                  {moves_performed}")
+        if apply_failures:
+            print(f"  Failed:                 {len(apply_failures)}")
+            print(f"  Not attempted:          {ops_not_attempted}")
     else:
         print("  Mode: DRY-RUN (use --apply to perform operations)")
 
@@ -548,36 +1079,37 @@ def main():
     duplicates_json_path = args.duplicates_json
     try:
         duplicates_dir = os.path.dirname(duplicates_json_path)
-        if duplicates_dir:
+        if duplicates_dir and report_stream is None:
             os.makedirs(duplicates_dir, exist_ok=True)
-        groups_json = []
-        for key in sorted(duplicates_report.keys()):
-            entries_json = []
-            for entry in duplicates_report[key]:
-                if len(entry) == 3 and entry[2] == "skipped-identical":
-                    entries_json.append({
-                        "src": entry[0],
-                        "status": "skipped-identical"
-                    })
-                else:
-                    src, rel = entry[0], entry[1]
-                    entries_json.append({
-                        "src": src,
-                        "planned_dest_rel": rel,
-                        "planned_dest_abs": os.path.join(args.dest_root, rel),
-                        "status": "planned"
-                    })
-            groups_json.append({"dest_key": key, "entries": entries_json})
+
+        def iter_groups_json():
+            # Built one group at a time so the report is never held in memory as a whole
+            for key in sorted(duplicates_report.keys()):
+                entries_json = []
+                for src, rel in duplicates_report[key]:
+                    if rel is None:
+                        entries_json.append({
+                            "src": src,
+                            "status": "skipped-identical"
+                        })
+                    else:
+                        entries_json.append({
+                            "src": src,
+                            "planned_dest_rel": rel,
+                            "planned_dest_abs": os.path.join(args.dest_root, rel),
+                            "status": "planned"
+                        })
+                yield {"dest_key": key, "entries": entries_json}
 
         schema_ref = os.path.relpath(
             os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas", "duplicates.schema.json"),
-            start=os.path.dirname(os.path.abspath(duplicates_json_path))
+            start=cwd if report_stream is not None else os.path.dirname(abspath_from(duplicates_json_path, cwd))
         )
         report_json = {
             "$schema": schema_ref,
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "pattern": args.pattern,
-            "dest_root": os.path.abspath(args.dest_root),
+            "dest_root": dest_root_abs,
             "apply": bool(args.apply),
             "mode": "MOVE" if args.move else "COPY",
             "stats": {
@@ -585,22 +1117,37 @@ def main():
                 "distinct_duplicates_kept": total_duplicates_kept,
                 "identical_duplicates_skipped": identical_duplicates_skipped
             },
-            "groups": groups_json,
         }
-        with open(duplicates_json_path, "w", encoding="utf-8") as f:
-            json.dump(report_json, f, indent=2, ensure_ascii=False)
-        print(f"  Duplicates report JSON written to: {duplicates_json_path}")
+        if report_stream is not None:
+            write_report_json(report_stream, report_json, "groups", iter_groups_json())
+            report_stream.write("\n")
+            report_stream.flush()
+            print("  Duplicates report JSON written to: stdout")
+        else:
+            with open(duplicates_json_path, "w", encoding="utf-8") as f:
+                write_report_json(f, report_json, "groups", iter_groups_json())
+            print(f"  Duplicates report JSON written to: {duplicates_json_path}")
     except Exception as e:
         print(f"WARNING: Failed to write duplicates report JSON: {e}", file=sys.stderr)
 
     # Optionally list missing sources
     if missing_sources:
-        print("\nMissing sources (skipped):")
-        for m in missing_sources[:50]:
-            print(f"  - {m}")
+        lines = ["", "Missing sources (skipped):"]
+        lines.extend(f"  - {m}" for m in missing_sources[:50])
         if len(missing_sources) > 50:
-            print(f"  ... and {len(missing_sources) - 50} more")
+            lines.append(f"  ... and {len(missing_sources) - 50} more")
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    if apply_failures:
+        for op, e in apply_failures:
+            print(f"ERROR: {op.action} failed: {op.src} -> {op.dest_abs}: {e}", file=sys.stderr)
+        print(
+            f"ERROR: Stopped after the first failure; {ops_not_attempted} planned operation(s) were not attempted.",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -2,6 +2,7 @@
 import sys
 import json
 import asyncio
+from typing import List, Optional
 
 
 async def _recognize_once(file_path: str) -> int:
@@ -20,11 +21,71 @@ async def _recognize_once(file_path: str) -> int:
     return 0
 
 
-def main() -> int:
-    if len(sys.argv) < 2:
+async def _recognize_or_warn(sh, file_path: str) -> Optional[dict]:
+    """Recognize one file with a shared client; on failure print the warning and return None."""
+    try:
+        return await sh.recognize(file_path)
+    except Exception as e:
+        print(f"[WARN] Recognize failed for {file_path}: {type(e).__name__}: {e}", file=sys.stderr)
+        return None
+
+
+async def _recognize_many(file_paths: List[str]) -> int:
+    """
+    Batch mode: recognize several files with one Shazam client, writing one
+    '<path>\t<json>' line per file to stdout (json is null if that file failed).
+    Returns 1 if any file failed, 0 otherwise.
+    """
+    try:
+        from shazamio import Shazam  # local import to allow tests without shazamio
+    except ImportError as e:
+        print(f"[WARN] shazamio is not available: {e}", file=sys.stderr)
+        return 1
+    sh = Shazam()
+    failed = False
+    for file_path in file_paths:
+        out = await _recognize_or_warn(sh, file_path)
+        failed = failed or out is None
+        sys.stdout.write(f"{file_path}\t{json.dumps(out, ensure_ascii=False)}\n")
+    sys.stdout.flush()
+    return 1 if failed else 0
+
+
+async def _serve() -> int:
+    """
+    Server mode: read one audio path per stdin line and answer each with one line of JSON
+    on stdout (null if recognition failed; the warning goes to stderr), until stdin closes.
+    One interpreter, import and Shazam client serve every request.
+    """
+    try:
+        from shazamio import Shazam  # local import to allow tests without shazamio
+    except ImportError as e:
+        print(f"[WARN] shazamio is not available: {e}", file=sys.stderr)
+        return 1
+    sh = Shazam()
+    for line in sys.stdin:
+        file_path = line.rstrip("\n")
+        if not file_path:
+            continue
+        out = await _recognize_or_warn(sh, file_path)
+        sys.stdout.write(json.dumps(out, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the CLI with argv (defaults to sys.argv[1:]) and return the exit code."""
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
         print("Usage: recognize_one.py <audio_file>", file=sys.stderr)
+        print("       recognize_one.py <audio_file> <audio_file>...  (one '<path>\\t<json>' line per file)", file=sys.stderr)
+        print("       recognize_one.py --server  (audio paths on stdin, one JSON line per path on stdout)", file=sys.stderr)
         return 2
-    file_path = sys.argv[1]
+    if args[0] == "--server":
+        return asyncio.run(_serve())
+    if len(args) > 1:
+        return asyncio.run(_recognize_many(args))
+    file_path = args[0]
 
 
     return asyncio.run(_recognize_once(file_path))
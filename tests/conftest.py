@@ -0,0 +1,220 @@
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+
+import pytest
+
+try:
+    import jsonschema  # optional: schema validation is skipped without it
+except ImportError:
+    jsonschema = None
+
+try:
+    import orjson  # optional: faster parsing of results, snapshots and schemas
+except ImportError:
+    orjson = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "tests" / "data"
+STUB_DIR = ROOT / "tests" / "stubs"
+FIXTURE_AUDIO = ("recognized_song.mp3", "unrecognized_song.mp3")
+RECOGNIZED_JSON = DATA_DIR / "recognized_song.json"
+_SKIP_REASON = (
+    f"Expected JSON snapshot not found: {RECOGNIZED_JSON}. "
+    "Generate it by running: python recognize_one.py tests/data/recognized_song.mp3 > tests/data/recognized_song.json"
+)
+
+# Set TESTS_SUBPROCESS=1 to run the scripts as real subprocesses in every test
+USE_SUBPROCESS = os.environ.get("TESTS_SUBPROCESS") == "1"
+# Subprocess output is read through large pipe buffers, and PYTHONUNBUFFERED is dropped so
+# the child block-buffers its per-file log lines instead of writing each one separately
+PIPE_BUFSIZE = 64 * 1024
+SUBPROCESS_ENV = {k: v for k, v in os.environ.items() if k != "PYTHONUNBUFFERED"}
+# SUBPROCESS_ENV with tests/stubs first on PYTHONPATH, so the scripts import the local 'shazamio' stub
+_PYTHONPATH = SUBPROCESS_ENV.get("PYTHONPATH", "")
+STUB_ENV = {**SUBPROCESS_ENV, "PYTHONPATH": f"{STUB_DIR}{os.pathsep}{_PYTHONPATH}" if _PYTHONPATH else str(STUB_DIR)}
+
+
+def _loads(data):
+    """Parse JSON from str or UTF-8 bytes, with orjson when installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@lru_cache(maxsize=None)
+def load_script_module(path: Path):
+    """Import the Python file at path, as a module named after its stem, once per test session."""
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_in_process(
+    script: Path, args: List[str], stub_shazamio: bool = False, binary: bool = False
+) -> subprocess.CompletedProcess:
+    """
+    Call script's main(args) in this interpreter with the repo root as cwd, capturing
+    stdout/stderr, and return the result shaped like a finished subprocess.
+    With stub_shazamio, the test 'shazamio' stub is installed in sys.modules for the call.
+    Saves an interpreter start and the imports for every test.
+    """
+    module = load_script_module(script)
+    out_buf, err_buf = io.BytesIO(), io.BytesIO()
+    out = io.TextIOWrapper(out_buf, encoding="utf-8", write_through=True)
+    err = io.TextIOWrapper(err_buf, encoding="utf-8", write_through=True)
+    prev_cwd = os.getcwd()
+    prev_shazamio = sys.modules.get("shazamio")
+    if stub_shazamio:
+        sys.modules["shazamio"] = load_script_module(STUB_DIR / "shazamio.py")
+    os.chdir(ROOT)
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                code = module.main(args)
+            except SystemExit as e:  # argparse errors
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        os.chdir(prev_cwd)
+        if stub_shazamio:
+            if prev_shazamio is None:
+                sys.modules.pop("shazamio", None)
+            else:
+                sys.modules["shazamio"] = prev_shazamio
+    stdout, stderr = out_buf.getvalue(), err_buf.getvalue()
+    if not binary:
+        stdout, stderr = stdout.decode("utf-8"), stderr.decode("utf-8")
+    return subprocess.CompletedProcess([str(script), *args], code, stdout, stderr)
+
+
+def run_script(
+    script: Path, args: List[str], timeout: int = 180, stub_shazamio: bool = False, binary: bool = False
+) -> subprocess.CompletedProcess:
+    """
+    Execute script with provided args, capturing stdout/stderr as text (bytes with binary).
+    Runs in-process unless TESTS_SUBPROCESS=1 (timeout then applies to the subprocess).
+    Uses the repo root as cwd so relative script paths resolve.
+    With stub_shazamio, the script imports the test 'shazamio' stub instead of the real package.
+    """
+    if not USE_SUBPROCESS:
+        return run_in_process(script, args, stub_shazamio, binary)
+    return subprocess.run(
+        [sys.executable, str(script), *args],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=not binary,
+        timeout=timeout,
+        check=False,
+        bufsize=PIPE_BUFSIZE,
+        env=STUB_ENV if stub_shazamio else SUBPROCESS_ENV,
+    )
+
+
+_SCHEMAS: Dict[str, Dict[str, Any]] = {}
+
+
+def _load_schema(name: str) -> Dict[str, Any]:
+    """
+    Parse schemas/<name> once per test session and return the cached dict.
+    """
+    schema = _SCHEMAS.get(name)
+    if schema is None:
+        schema = _SCHEMAS[name] = _loads((ROOT / "schemas" / name).read_bytes())
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _get_validator(schema_name: str):
+    """
+    Build the validator for schemas/<schema_name> once per test session; skips if jsonschema is missing.
+    """
+    if jsonschema is None:
+        pytest.skip("jsonschema package required for schema validation")
+    schema = _load_schema(schema_name)
+    validator_cls = getattr(jsonschema, "Draft202012Validator", None) or jsonschema.Draft7Validator
+    return validator_cls(schema)
+
+
+@pytest.fixture(scope="session")
+def fixture_cache(tmp_path_factory) -> Dict[str, Tuple[Path, str]]:
+    """
+    Copy the test audio files once per session and memoize their SHA-256.
+    Returns {name: (cached_path, sha256)}. Tests hardlink the cached copies instead of
+    copying from tests/data each time; linking to private copies keeps tests/data itself
+    out of reach of anything a test does to its inputs.
+    """
+    # Resolved once here so every path derived from the cache is already canonical
+    cache_dir = tmp_path_factory.mktemp("fixture_cache", numbered=False).resolve()
+    cache: Dict[str, Tuple[Path, str]] = {}
+    for name in FIXTURE_AUDIO:
+        src = DATA_DIR / name
+        assert src.exists(), f"Missing test data: {src}"
+        dst = cache_dir / name
+        shutil.copyfile(src, dst)
+        cache[name] = (dst, hashlib.sha256(dst.read_bytes()).hexdigest())
+    return cache
+
+
+@pytest.fixture(scope="session")
+def shared_inputs(tmp_path_factory) -> Path:
+    """
+    Session-wide directory for test inputs that are only read, never modified or moved.
+    Tests place their inputs under a subdirectory named after the test, so they do not
+    pay for a per-test tmp_path; tests that change their inputs keep using tmp_path.
+    """
+    return tmp_path_factory.mktemp("inputs", numbered=False)
+
+
+@pytest.fixture(scope="session")
+def data_files() -> Dict[str, Path]:
+    """
+    Manifest of the files in tests/data, {name: path}, from one directory scan per session.
+    A missing file is simply absent from the dict, so tests check presence with a lookup.
+    """
+    with os.scandir(DATA_DIR) as it:
+        return {e.name: Path(e.path) for e in it if e.is_file()}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def prefetch_test_files(data_files) -> None:
+    """
+    Ask the kernel to read ahead the scripts, the stubs and the test data at session start
+    (POSIX_FADV_WILLNEED), so the first test finds them in the page cache like every later one.
+    No-op where os.posix_fadvise is unavailable.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    paths = [*ROOT.glob("*.py"), *STUB_DIR.glob("*.py"), *data_files.values()]
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+@pytest.fixture(scope="session")
+def expected_snapshot(data_files) -> Mapping[str, Any]:
+    """
+    tests/data/recognized_song.json parsed once per session; skips the requesting test if it is missing.
+    Returned as a read-only MappingProxyType; nested objects are shared too, so callers must not modify them.
+    """
+    snap_path = data_files.get(RECOGNIZED_JSON.name)
+    if snap_path is None:
+        pytest.skip(_SKIP_REASON)
+    return MappingProxyType(_loads(snap_path.read_bytes()))
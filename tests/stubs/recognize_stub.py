@@ -12,6 +12,29 @@ Behavior:
 import sys
 import json
 from pathlib import Path
+from typing import Optional
+
+_ROOT = Path(__file__).resolve().parents[2]  # repo root, resolved once at import
+_SNAP_PATH = _ROOT / "tests" / "data" / "recognized_song.json"
+
+# Snapshot text, read on first use and reused if main() runs again in the same process
+_snapshot_text: Optional[str] = None
+_snap_exists: Optional[bool] = None  # memoized _SNAP_PATH.exists()
+
+
+def _snapshot_exists() -> bool:
+    global _snap_exists
+    if _snap_exists is None:
+        _snap_exists = _SNAP_PATH.exists()
+    return _snap_exists
+
+
+def _read_snapshot() -> str:
+    global _snapshot_text
+    if _snapshot_text is None:
+        with _SNAP_PATH.open("r", encoding="utf-8") as f:
+            _snapshot_text = f.read()
+    return _snapshot_text
 
 
 def main() -> int:
@@ -21,13 +44,8 @@ def main() -> int:
 
     file_path = sys.argv[1]
     try:
-        root = Path(__file__).resolve().parents[2]  # repo root
-        data_dir = root / "tests" / "data"
-        recognized_snap = data_dir / "recognized_song.json"
-
-        if file_path.endswith("recognized_song.mp3") and recognized_snap.exists():
-            with recognized_snap.open("r", encoding="utf-8") as f:
-                sys.stdout.write(f.read())
+        if file_path.endswith("recognized_song.mp3") and _snapshot_exists():
+            sys.stdout.write(_read_snapshot())
             sys.stdout.flush()
             return 0
         else:
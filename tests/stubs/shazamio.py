@@ -7,17 +7,32 @@ Provides a Shazam class with an async recognize(file_path) method that returns:
 """
 
 import json
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Union
+
+_ROOT = Path(__file__).resolve().parents[2]  # repo root, resolved once at import
+_SNAP_PATH = _ROOT / "tests" / "data" / "recognized_song.json"
+_snap_exists: Optional[bool] = None  # memoized _SNAP_PATH.exists()
+
+
+def _snapshot_exists() -> bool:
+    global _snap_exists
+    if _snap_exists is None:
+        _snap_exists = _SNAP_PATH.exists()
+    return _snap_exists
+
+
+@lru_cache(maxsize=1)
+def _load_snapshot() -> Dict[str, Any]:
+    # Parsed once per process; callers only read the result, so it is shared rather than copied
+    with _SNAP_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 class Shazam:
-    async def recognize(self, file_path: str) -> Dict[str, Any]:
-        root = Path(__file__).resolve().parents[2]  # repo root
-        data_dir = root / "tests" / "data"
-        snap = data_dir / "recognized_song.json"
-
-        if Path(file_path).name == "recognized_song.mp3" and snap.exists():
-            with snap.open("r", encoding="utf-8") as f:
-                return json.load(f)
+    async def recognize(self, file_path: Union[str, "os.PathLike[str]"]) -> Dict[str, Any]:
+        if os.path.basename(os.fspath(file_path)) == "recognized_song.mp3" and _snapshot_exists():
+            return _load_snapshot()
         return {"matches": []}
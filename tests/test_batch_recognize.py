@@ -1,41 +1,29 @@
-import json
 import os
-import sys
 import shutil
-import subprocess
 from pathlib import Path
 from typing import Tuple, Dict, Any, List
 
 import pytest
 
+from conftest import ROOT, STUB_DIR, _get_validator, _loads, run_script
+
 
-ROOT = Path(__file__).resolve().parents[1]
 SCRIPT = ROOT / "batch_recognize.py"
-DATA_DIR = ROOT / "tests" / "data"
-BUILD_DIR = ROOT / "build" / "test_batch_recognize"
+# Under pytest-xdist each worker gets its own build directory so outputs never collide
+_XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+BUILD_DIR = ROOT / "build" / ("test_batch_recognize_" + _XDIST_WORKER if _XDIST_WORKER else "test_batch_recognize")
 
 
-def run_script(args: List[str], timeout: int = 180) -> subprocess.CompletedProcess:
-    """
-    Execute batch_recognize.py with provided args, capturing stdout/stderr.
-    Uses the repo root as cwd so relative script paths resolve.
-    Always injects the test recognizer stub to avoid network/service calls.
-    """
-    stub = ROOT / "tests" / "stubs" / "recognize_stub.py"
-    cmd = [sys.executable, str(SCRIPT), *args, "--recognizer-script", str(stub)]
-    return subprocess.run(
-        cmd,
-        cwd=str(ROOT),
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-        check=False,
-    )
+# Every run recognizes through the test recognizer stub, so no network or service is used
+RECOGNIZER_STUB_ARGS = ["--recognizer-script", str(STUB_DIR / "recognize_stub.py")]
 
 
-def setup_input_dir(tmp_path: Path, layout: str = "flat") -> Tuple[Path, Dict[str, Path]]:
+def setup_input_dir(
+    tmp_path: Path, fixture_cache: Dict[str, Tuple[Path, str]], layout: str = "flat"
+) -> Tuple[Path, Dict[str, Path]]:
     """
-    Prepare an input directory containing test mp3 files copied from tests/data.
+    Prepare an input directory containing the test mp3 files, hardlinked from the
+    session-cached copies (see conftest.fixture_cache; copied if linking is not possible).
 
     layout:
       - "flat": place files at top-level
@@ -53,36 +41,20 @@ def setup_input_dir(tmp_path: Path, layout: str = "flat") -> Tuple[Path, Dict[st
         target_dir = input_dir
 
     files = {}
-    src_recognized = DATA_DIR / "recognized_song.mp3"
-    src_unrecognized = DATA_DIR / "unrecognized_song.mp3"
-    assert src_recognized.exists(), f"Missing test data: {src_recognized}"
-    assert src_unrecognized.exists(), f"Missing test data: {src_unrecognized}"
-
-    files["recognized"] = target_dir / "recognized_song.mp3"
-    files["unrecognized"] = target_dir / "unrecognized_song.mp3"
-    shutil.copyfile(src_recognized, files["recognized"])
-    shutil.copyfile(src_unrecognized, files["unrecognized"])
+    for key in ("recognized", "unrecognized"):
+        src = fixture_cache[f"{key}_song.mp3"][0]
+        files[key] = target_dir / src.name
+        try:
+            os.link(src, files[key])
+        except (OSError, NotImplementedError):
+            # Cross-device, or links unsupported/denied on this filesystem
+            shutil.copyfile(src, files[key])
 
     return input_dir, files
 
 
-def load_expected_track_from_snapshot() -> Dict[str, Any]:
-    """
-    Load a stable subset of fields from tests/data/recognized_song.json to compare recognized metadata.
-    """
-    snap_path = DATA_DIR / "recognized_song.json"
-    if not snap_path.exists():
-        pytest.skip(
-            f"Expected JSON snapshot not found: {snap_path}. "
-            "Generate it by running: python recognize_one.py tests/data/recognized_song.mp3 > tests/data/recognized_song.json"
-        )
-    with snap_path.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-
 def read_results_json(path: Path) -> Dict[str, Any]:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return _loads(path.read_bytes())
 
 
 def read_unrecognized_lines(path: Path) -> List[Tuple[str, str]]:
@@ -90,16 +62,11 @@ def read_unrecognized_lines(path: Path) -> List[Tuple[str, str]]:
     Read unrecognized file lines: each line is '<path>\\t<reason>'.
     """
     lines = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line:
-                continue
-            parts = line.split("\t", 1)
-            if len(parts) == 2:
-                lines.append((parts[0], parts[1]))
-            else:
-                lines.append((parts[0], ""))
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line:
+            continue
+        parts = line.split("\t", 1)
+        lines.append((parts[0], parts[1] if len(parts) == 2 else ""))
     return lines
 
 
@@ -108,44 +75,79 @@ def validate_against_schema(instance: Dict[str, Any]) -> None:
     Validate the results JSON against schemas/recognized.schema.json if jsonschema is available.
     Skips gracefully if jsonschema is not installed in the environment.
     """
-    jsonschema = pytest.importorskip("jsonschema", reason="jsonschema package required for schema validation")
-    schema_path = ROOT / "schemas" / "recognized.schema.json"
-    with schema_path.open("r", encoding="utf-8") as f:
-        schema = json.load(f)
-    # Use Draft 2020-12 validator
-    validator_cls = getattr(jsonschema, "Draft202012Validator", None) or jsonschema.Draft7Validator
-    validator = validator_cls(schema)
-    validator.validate(instance)
+    _get_validator("recognized.schema.json").validate(instance)
+
+
+@pytest.fixture(scope="module")
+def batch_results(tmp_path_factory, fixture_cache) -> Dict[str, Dict[str, Any]]:
+    """
+    Run batch_recognize.py once per input layout and share the outputs across tests:
+      - "flat": both files at top level, with --dump-every 1 so checkpoints are covered by the same run
+      - "nested": both files in a subdirectory, scanned recursively
+    Each value holds "input_dir", "out_path" and the finished "proc".
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for layout, out_name, extra in (
+        ("flat", "recognized.json", ["--dump-every", "1"]),
+        ("nested", "recursive.json", []),
+    ):
+        input_dir, _ = setup_input_dir(tmp_path_factory.mktemp(layout, numbered=False), fixture_cache, layout=layout)
+        out_path = BUILD_DIR / out_name
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        proc = run_script(
+            SCRIPT, [str(input_dir), "-o", str(out_path), "--delay", "0.0", "-c", "2", *extra, *RECOGNIZER_STUB_ARGS]
+        )
+        results[layout] = {"input_dir": input_dir, "out_path": out_path, "proc": proc}
+    return results
 
 
 def test_usage_invalid_folder_exits_2(tmp_path: Path):
     bad_folder = tmp_path / "does_not_exist"
     out_path = BUILD_DIR / "invalid.json"
-    proc = run_script([str(bad_folder), "-o", str(out_path)])
+    proc = run_script(SCRIPT, [str(bad_folder), "-o", str(out_path), *RECOGNIZER_STUB_ARGS])
     assert proc.returncode == 2, f"Expected exit code 2 for invalid folder, got {proc.returncode}"
     assert "does not exist or is not a directory" in proc.stderr
 
 
-def test_non_recursive_ignores_nested_files(tmp_path: Path):
-    input_dir, _ = setup_input_dir(tmp_path, layout="nested")
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() == 0, reason="needs a non-root POSIX user for chmod 000 to deny reads"
+)
+def test_unreadable_subdirectory_is_skipped(tmp_path: Path, fixture_cache):
+    input_dir, _ = setup_input_dir(tmp_path, fixture_cache, layout="flat")
+    locked = input_dir / "locked"
+    locked.mkdir()
+    os.link(fixture_cache["recognized_song.mp3"][0], locked / "hidden.mp3")
+    locked.chmod(0)
+    out_path = BUILD_DIR / "unreadable_subdir.json"
+    try:
+        proc = run_script(SCRIPT, [str(input_dir), "-o", str(out_path), "--delay", "0.0", *RECOGNIZER_STUB_ARGS])
+    finally:
+        locked.chmod(0o755)
+    assert proc.returncode == 0, proc.stderr
+
+    # Both top-level files are processed; the unreadable folder is skipped instead of aborting the run
+    mapping = {k: v for k, v in read_results_json(out_path).items() if k != "$schema"}
+    unrec_lines = read_unrecognized_lines(out_path.with_name(out_path.stem + ".unrecognized.txt"))
+    processed = set(mapping) | {p for p, _ in unrec_lines}
+    assert processed == {str(input_dir / "recognized_song.mp3"), str(input_dir / "unrecognized_song.mp3")}
+
+
+def test_non_recursive_ignores_nested_files(batch_results):
+    input_dir = batch_results["nested"]["input_dir"]
     out_path = BUILD_DIR / "non_recursive.json"
     # Ensure clean slate
     if out_path.exists():
         out_path.unlink()
 
-    proc = run_script([str(input_dir), "--non-recursive", "-o", str(out_path)])
+    proc = run_script(SCRIPT, [str(input_dir), "--non-recursive", "-o", str(out_path), *RECOGNIZER_STUB_ARGS])
     assert proc.returncode == 0, f"Expected 0 when no files found, got {proc.returncode}"
     assert "No audio files found to process." in proc.stderr
     assert not out_path.exists(), "Output should not be created when no files are processed"
 
 
-def test_process_two_files_and_validate_schema_and_outputs(tmp_path: Path):
-    input_dir, files = setup_input_dir(tmp_path, layout="flat")
-    out_path = BUILD_DIR / "recognized.json"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # Run with concurrency and no delay to exercise flags
-    proc = run_script([str(input_dir), "-o", str(out_path), "--delay", "0.0", "-c", "2"])
+def test_process_two_files_and_validate_schema_and_outputs(expected_snapshot, batch_results):
+    # Shared run with concurrency and no delay to exercise flags
+    proc, out_path = batch_results["flat"]["proc"], batch_results["flat"]["out_path"]
     assert proc.returncode == 0, f"Expected exit code 0, got {proc.returncode}"
     assert out_path.exists(), f"Expected results JSON at {out_path}"
 
@@ -172,8 +174,7 @@ def test_process_two_files_and_validate_schema_and_outputs(tmp_path: Path):
     assert any(os.path.isabs(k) for k in mapping.keys()), "Keys must be absolute file paths"
 
     # If recognized file was included, validate core fields
-    snap = load_expected_track_from_snapshot()
-    exp_track = snap.get("track", {})
+    exp_track = expected_snapshot.get("track", {})
     exp_author = exp_track.get("subtitle")
     exp_song = exp_track.get("title")
 
@@ -202,19 +203,20 @@ def test_process_two_files_and_validate_schema_and_outputs(tmp_path: Path):
     assert processed_count == 2, f"Expected 2 files processed, got {processed_count}"
 
     # errors.jsonl may be empty if no child errors occurred
-    with errors_path.open("r", encoding="utf-8") as ef:
-        lines = [ln for ln in ef.read().splitlines() if ln.strip()]
-        for line in lines:
-            obj = json.loads(line)
-            assert "file" in obj and "error" in obj
+    lines = [ln for ln in errors_path.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    for line in lines:
+        obj = _loads(line)
+        assert "file" in obj and "error" in obj
 
 
-def test_limit_flag_limits_total_processed(tmp_path: Path):
-    input_dir, _ = setup_input_dir(tmp_path, layout="flat")
+def test_limit_flag_limits_total_processed(shared_inputs: Path, fixture_cache):
+    input_dir, _ = setup_input_dir(shared_inputs / "limit", fixture_cache, layout="flat")
     out_path = BUILD_DIR / "limit.json"
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    proc = run_script([str(input_dir), "-o", str(out_path), "--limit", "1", "--delay", "0.0", "-c", "2"])
+    proc = run_script(
+        SCRIPT, [str(input_dir), "-o", str(out_path), "--limit", "1", "--delay", "0.0", "-c", "2", *RECOGNIZER_STUB_ARGS]
+    )
     assert proc.returncode == 0, f"Expected exit code 0, got {proc.returncode}"
     assert out_path.exists(), f"Expected results JSON at {out_path}"
 
@@ -227,24 +229,17 @@ def test_limit_flag_limits_total_processed(tmp_path: Path):
     assert processed_count == 1, f"--limit 1 should process exactly 1 file, got {processed_count}"
 
 
-def test_dump_every_writes_checkpoint_message(tmp_path: Path):
-    input_dir, _ = setup_input_dir(tmp_path, layout="flat")
-    out_path = BUILD_DIR / "checkpoint.json"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    proc = run_script([str(input_dir), "-o", str(out_path), "--dump-every", "1", "--delay", "0.0", "-c", "2"])
+def test_dump_every_writes_checkpoint_message(batch_results):
+    # The shared flat run uses --dump-every 1
+    proc, out_path = batch_results["flat"]["proc"], batch_results["flat"]["out_path"]
     assert proc.returncode == 0, f"Expected exit code 0, got {proc.returncode}"
     assert out_path.exists(), "Final output should exist"
     # Heuristic: expect at least one checkpoint message in stderr
     assert "Checkpoint: wrote" in proc.stderr, "Expected checkpoint message when --dump-every=1 is set"
 
 
-def test_recursive_finds_nested_files(tmp_path: Path):
-    input_dir, _ = setup_input_dir(tmp_path, layout="nested")
-    out_path = BUILD_DIR / "recursive.json"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    proc = run_script([str(input_dir), "-o", str(out_path), "--delay", "0.0", "-c", "2"])
+def test_recursive_finds_nested_files(batch_results):
+    proc, out_path = batch_results["nested"]["proc"], batch_results["nested"]["out_path"]
     assert proc.returncode == 0, f"Expected exit code 0, got {proc.returncode}"
     assert out_path.exists(), "Output should be created with recursive scan"
 
@@ -255,3 +250,24 @@ def test_recursive_finds_nested_files(tmp_path: Path):
 
     processed_count = len(mapping) + len(unrec_lines)
     assert processed_count == 2, f"Expected 2 nested files processed, got {processed_count}"
+
+
+def test_in_process_recognition_without_recognizer_script(expected_snapshot, shared_inputs: Path, fixture_cache):
+    input_dir, _ = setup_input_dir(shared_inputs / "in_process", fixture_cache, layout="flat")
+    out_path = BUILD_DIR / "in_process.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # No --recognizer-script: recognition runs in-process; tests/stubs provides the 'shazamio' stub
+    proc = run_script(
+        SCRIPT, [str(input_dir), "-o", str(out_path), "--delay", "0.0", "-c", "2"], stub_shazamio=True
+    )
+    assert proc.returncode == 0, f"Expected exit code 0, got {proc.returncode}: {proc.stderr}"
+
+    results_obj = read_results_json(out_path)
+    validate_against_schema(results_obj)
+    mapping = {k: v for k, v in results_obj.items() if k != "$schema"}
+    unrec_lines = read_unrecognized_lines(out_path.with_name(out_path.stem + ".unrecognized.txt"))
+    assert len(mapping) + len(unrec_lines) == 2, "Expected 2 files processed in-process"
+
+    exp_track = expected_snapshot.get("track", {})
+    assert [meta["song"] for meta in mapping.values()] == [exp_track.get("title")]
@@ -1,45 +1,62 @@
+import importlib.util
 import json
 import os
-import sys
 import shutil
+import sqlite3
 import subprocess
+import sys
 import hashlib
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 
 import pytest
 
+from conftest import ROOT, _get_validator, _loads, run_script
+
+try:
+    import orjson  # optional: faster serialization of test inputs
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize obj as 2-space indented UTF-8 JSON bytes, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
 
-ROOT = Path(__file__).resolve().parents[1]
 SCRIPT = ROOT / "organize_recognized.py"
 DATA_DIR = ROOT / "tests" / "data"
-BUILD_DIR = ROOT / "build" / "test_organize_recognized"
+# Under pytest-xdist each worker gets its own build directory so outputs never collide
+_XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+BUILD_DIR = ROOT / "build" / ("test_organize_recognized_" + _XDIST_WORKER if _XDIST_WORKER else "test_organize_recognized")
 
 
-def run_script(args: List[str], timeout: int = 180) -> subprocess.CompletedProcess:
-    """
-    Execute organize_recognized.py with provided args, capturing stdout/stderr.
-    Uses the repo root as cwd so relative script paths resolve.
-    """
-    cmd = [sys.executable, str(SCRIPT), *args]
-    return subprocess.run(
-        cmd,
-        cwd=str(ROOT),
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-        check=False,
-    )
+# Files up to this size are hashed from a single read when hashlib.file_digest is unavailable
+_SINGLE_READ_LIMIT = 64 * 1024 * 1024
 
 
 def compute_sha256(p: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
     with p.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: hashes in C without a Python-level read loop
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size <= _SINGLE_READ_LIMIT:
+            # Test fixtures are small: one read, one C-level hash
+            return hashlib.sha256(f.read()).hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(chunk_size), b""):
             h.update(chunk)
     return h.hexdigest()
 
 
+# Reserved/unsafe/control characters replaced by sanitize_component
+_SANITIZE_TABLE = str.maketrans({**{c: "-" for c in '<>:\\"|?*'}, **{chr(i): "-" for i in range(32)}})
+
+
+@lru_cache(maxsize=1024)
 def sanitize_component(s: str) -> str:
     """
     Mirror sanitize_component rules to build deterministic expected paths in simple cases.
@@ -51,14 +68,7 @@ def sanitize_component(s: str) -> str:
     # Replace path separators
     s = s.replace("/", "-").replace("\\", "-")
     # Replace reserved/unsafe/control characters
-    out = []
-    for ch in s:
-        code = ord(ch)
-        if code < 32 or ch in '<>:\\"|?*':
-            out.append("-")
-        else:
-            out.append(ch)
-    s = "".join(out)
+    s = s.translate(_SANITIZE_TABLE)
     # Collapse whitespace and trim problematic trailing chars
     s = " ".join(s.split())
     s = s.strip(" .")
@@ -75,8 +85,7 @@ def write_recognized_mapping(path: Path, mapping: Dict[str, Dict[str, Any]]) ->
     obj: Dict[str, Any] = {"$schema": "https://example.com/schemas/recognized.schema.json"}
     obj.update(mapping)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    path.write_bytes(_dumps(obj))
     return path
 
 
@@ -84,39 +93,45 @@ def validate_recognized_schema(instance: Dict[str, Any]) -> None:
     """
     Validate a recognized mapping against schemas/recognized.schema.json if jsonschema is available.
     """
-    jsonschema = pytest.importorskip("jsonschema", reason="jsonschema package required for schema validation")
-    schema_path = ROOT / "schemas" / "recognized.schema.json"
-    with schema_path.open("r", encoding="utf-8") as f:
-        schema = json.load(f)
-    validator_cls = getattr(jsonschema, "Draft202012Validator", None) or jsonschema.Draft7Validator
-    validator = validator_cls(schema)
-    validator.validate(instance)
+    _get_validator("recognized.schema.json").validate(instance)
 
 
 def validate_duplicates_schema(instance: Dict[str, Any]) -> None:
     """
     Validate a duplicates report against schemas/duplicates.schema.json if jsonschema is available.
     """
-    jsonschema = pytest.importorskip("jsonschema", reason="jsonschema package required for schema validation")
-    schema_path = ROOT / "schemas" / "duplicates.schema.json"
-    with schema_path.open("r", encoding="utf-8") as f:
-        schema = json.load(f)
-    validator_cls = getattr(jsonschema, "Draft202012Validator", None) or jsonschema.Draft7Validator
-    validator = validator_cls(schema)
+    validator = _get_validator("duplicates.schema.json")
     # Some reports include a $schema meta-field not modeled in the schema; drop it for validation.
     instance_no_meta = {k: v for k, v in instance.items() if k != "$schema"}
     validator.validate(instance_no_meta)
 
 
-def copy_test_audio(src_name: str, dst: Path) -> Path:
+def copy_test_audio(src_name: str, dst: Path, fixture_cache: Dict[str, Tuple[Path, str]], link: bool = True) -> Path:
     """
-    Copy a file from tests/data to dst and return its absolute path.
+    Place a test audio file at dst and return its absolute path.
+    Hardlinks the session-cached copy (see conftest.fixture_cache); pass link=False when
+    the test modifies the file, so the shared copy stays intact.
+    dst is built from pytest's temp directories, which are already resolved, so it is
+    returned as is; only a relative dst is made absolute (without touching the filesystem).
     """
-    src = DATA_DIR / src_name
-    assert src.exists(), f"Missing test data: {src}"
+    src = fixture_cache[src_name][0]
+    if not dst.is_absolute():
+        dst = Path(os.path.abspath(dst))
     dst.parent.mkdir(parents=True, exist_ok=True)
+    if link:
+        try:
+            os.link(src, dst)
+            return dst
+        except (OSError, NotImplementedError):
+            # Cross-device, or links unsupported/denied on this filesystem
+            pass
     shutil.copyfile(src, dst)
-    return dst.resolve()
+    return dst
+
+
+def _has_mp3(root: Path) -> bool:
+    """True if any *.mp3 file exists under root."""
+    return root.exists() and any(root.rglob("*.mp3"))
 
 
 def test_usage_requires_input():
@@ -131,14 +146,15 @@ def test_usage_requires_input():
     assert "usage:" in proc.stderr.lower() and "organize_recognized.py" in proc.stderr
 
 
-def test_dry_run_produces_plan_and_duplicates_report(tmp_path: Path):
+def test_dry_run_produces_plan_and_duplicates_report(shared_inputs: Path, fixture_cache):
+    inputs = shared_inputs / "dry_run_produces_plan_and_duplicates_report"
     work = BUILD_DIR / "dry_run"
     dest_root = work / "dest"
     duplicates_json = work / "duplicates.dry_run.json"
 
     # Prepare a single recognized mapping
-    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "Artist - Song.mp3")
-    src_hash = compute_sha256(src_mp3)
+    src_mp3 = copy_test_audio("recognized_song.mp3", inputs / "Artist - Song.mp3", fixture_cache)
+    src_hash = fixture_cache["recognized_song.mp3"][1]
     mapping_path = work / "recognized.map.json"
     mapping = {
         str(src_mp3): {
@@ -153,10 +169,9 @@ def test_dry_run_produces_plan_and_duplicates_report(tmp_path: Path):
     write_recognized_mapping(mapping_path, mapping)
 
     # Sanity: validate mapping schema
-    with mapping_path.open("r", encoding="utf-8") as f:
-        validate_recognized_schema(json.load(f))
+    validate_recognized_schema(_loads(mapping_path.read_bytes()))
 
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
         "--duplicates-json", str(duplicates_json),
@@ -168,12 +183,11 @@ def test_dry_run_produces_plan_and_duplicates_report(tmp_path: Path):
     assert "Mode: DRY-RUN" in proc.stdout
 
     # No files should be created in dest_root on dry-run
-    assert not dest_root.exists() or not any(dest_root.rglob("*.mp3"))
+    assert not _has_mp3(dest_root)
 
     # Duplicates report should be created
     assert duplicates_json.exists(), f"Expected duplicates report {duplicates_json}"
-    with duplicates_json.open("r", encoding="utf-8") as f:
-        dup_obj = json.load(f)
+    dup_obj = _loads(duplicates_json.read_bytes())
     assert dup_obj["apply"] is False
     assert dup_obj["mode"] == "COPY"
     validate_duplicates_schema(dup_obj)
@@ -183,153 +197,93 @@ def test_dry_run_produces_plan_and_duplicates_report(tmp_path: Path):
     assert compute_sha256(src_mp3) == src_hash
 
 
-def test_apply_copy_preserves_hash_and_structure(tmp_path: Path):
-    work = BUILD_DIR / "apply_copy"
-    dest_root = work / "dest"
-    duplicates_json = work / "duplicates.copy.json"
-
-    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "source.mp3")
-    src_hash = compute_sha256(src_mp3)
-    mapping_path = work / "recognized.map.json"
-
-    author = "Artist"
-    album = "Album"
-    song = "Song"
-    mapping = {
-        str(src_mp3): {
-            "author": author,
-            "album": album,
-            "song": song,
-            "author_unknown": False,
-            "album_unknown": False,
-            "song_unknown": False,
-        }
-    }
-    write_recognized_mapping(mapping_path, mapping)
-
-    proc = run_script([
-        "-i", str(mapping_path),
-        "-d", str(dest_root),
-        "--duplicates-json", str(duplicates_json),
-        "--apply"
-    ])
-    assert proc.returncode == 0, proc.stderr
-    # Expected destination path
-    rel = Path(sanitize_component(author)) / sanitize_component(album) / sanitize_component(song)
-    expected = dest_root / f"{rel}.mp3"
-    assert expected.exists(), f"Expected file at {expected}"
-    assert compute_sha256(expected) == src_hash, "Copied file hash must match source"
-    # Source still exists on copy
-    assert src_mp3.exists()
-
-    # Duplicates report
-    assert duplicates_json.exists()
-    with duplicates_json.open("r", encoding="utf-8") as f:
-        dup_obj = json.load(f)
-    assert dup_obj["apply"] is True and dup_obj["mode"] == "COPY"
-    validate_duplicates_schema(dup_obj)
-
-
-def test_apply_move_removes_source(tmp_path: Path):
-    work = BUILD_DIR / "apply_move"
+# (author, album, song, album_unknown, extra args, mode, expected path relative to dest)
+# Expected paths are sanitized once here, at collection time, rather than per test run.
+APPLY_CASES = [
+    pytest.param(
+        "Artist", "Album", "Song", False, [], "COPY",
+        f"{sanitize_component('Artist')}/{sanitize_component('Album')}/{sanitize_component('Song')}.mp3",
+        id="copy",
+    ),
+    pytest.param(
+        "Mover", "Album", "Track", False, ["--move"], "MOVE",
+        f"{sanitize_component('Mover')}/{sanitize_component('Album')}/{sanitize_component('Track')}.mp3",
+        id="move",
+    ),
+    # album_unknown True should set 'Unknown Album' in pre-processing; dropped by default
+    pytest.param(
+        "AA", "Unknown Album", "SS", True, [], "COPY",
+        f"{sanitize_component('AA')}/{sanitize_component('SS')}.mp3",
+        id="drop-unknowns",
+    ),
+    pytest.param(
+        "AA", "Unknown Album", "SS", True, ["--keep-unknowns"], "COPY",
+        f"{sanitize_component('AA')}/{sanitize_component('Unknown Album')}/{sanitize_component('SS')}.mp3",
+        id="keep-unknowns",
+    ),
+]
+
+
+@pytest.mark.parametrize("author,album,song,album_unknown,flags,mode,expected_rel", APPLY_CASES)
+def test_apply_places_file_at_expected_path(
+    tmp_path: Path,
+    fixture_cache,
+    request,
+    author: str,
+    album: str,
+    song: str,
+    album_unknown: bool,
+    flags: List[str],
+    mode: str,
+    expected_rel: str,
+):
+    work = BUILD_DIR / f"apply_{request.node.callspec.id}"
     dest_root = work / "dest"
-    duplicates_json = work / "duplicates.move.json"
 
-    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "to_move.mp3")
-    src_hash = compute_sha256(src_mp3)
+    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "source.mp3", fixture_cache)
+    src_hash = fixture_cache["recognized_song.mp3"][1]
     mapping_path = work / "recognized.map.json"
 
-    author = "Mover"
-    album = "Album"
-    song = "Track"
     mapping = {
         str(src_mp3): {
             "author": author,
             "album": album,
             "song": song,
             "author_unknown": False,
-            "album_unknown": False,
+            "album_unknown": album_unknown,
             "song_unknown": False,
         }
     }
     write_recognized_mapping(mapping_path, mapping)
 
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
-        "--duplicates-json", str(duplicates_json),
+        "--duplicates-json", "-",
         "--apply",
-        "--move"
+        *flags,
     ])
     assert proc.returncode == 0, proc.stderr
-    expected = dest_root / f"{sanitize_component(author)}/{sanitize_component(album)}/{sanitize_component(song)}.mp3"
-    assert expected.exists(), f"Expected moved file at {expected}"
-    assert compute_sha256(expected) == src_hash
-    # Source removed
-    assert not src_mp3.exists()
-
-    with duplicates_json.open("r", encoding="utf-8") as f:
-        dup_obj = json.load(f)
-    assert dup_obj["apply"] is True and dup_obj["mode"] == "MOVE"
+    expected = dest_root / expected_rel
+    assert expected.exists(), f"Expected file at {expected}"
+    assert compute_sha256(expected) == src_hash, "Placed file hash must match source"
+    # Copy keeps the source, move removes it
+    assert src_mp3.exists() == (mode == "COPY")
+
+    # Duplicates report, streamed to stdout ('-') with the summary on stderr
+    dup_obj = _loads(proc.stdout)
+    assert "Summary:" in proc.stderr
+    assert dup_obj["apply"] is True and dup_obj["mode"] == mode
     validate_duplicates_schema(dup_obj)
 
 
-def test_keep_unknowns_and_drop_unknowns_affect_path(tmp_path: Path):
-    work = BUILD_DIR / "unknowns"
-    dest_drop = work / "dest_drop"
-    dest_keep = work / "dest_keep"
-    dup_drop = work / "dup.drop.json"
-    dup_keep = work / "dup.keep.json"
-
-    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "unknown_case.mp3")
-    mapping_path = work / "recognized.map.json"
-
-    author = "AA"
-    album = "Unknown Album"
-    song = "SS"
-    # album_unknown True should set 'Unknown Album' in pre-processing
-    mapping = {
-        str(src_mp3): {
-            "author": author,
-            "album": album,
-            "song": song,
-            "author_unknown": False,
-            "album_unknown": True,
-            "song_unknown": False,
-        }
-    }
-    write_recognized_mapping(mapping_path, mapping)
-
-    # Drop unknowns (default)
-    proc1 = run_script([
-        "-i", str(mapping_path),
-        "-d", str(dest_drop),
-        "--duplicates-json", str(dup_drop),
-        "--apply"
-    ])
-    assert proc1.returncode == 0
-    expected_drop = dest_drop / f"{sanitize_component(author)}/{sanitize_component(song)}.mp3"
-    assert expected_drop.exists(), f"Album 'Unknown' component should be dropped: {expected_drop}"
-
-    # Keep unknowns
-    proc2 = run_script([
-        "-i", str(mapping_path),
-        "-d", str(dest_keep),
-        "--duplicates-json", str(dup_keep),
-        "--keep-unknowns",
-        "--apply"
-    ])
-    assert proc2.returncode == 0
-    expected_keep = dest_keep / f"{sanitize_component(author)}/{sanitize_component('Unknown Album')}/{sanitize_component(song)}.mp3"
-    assert expected_keep.exists(), f"Album 'Unknown' should be kept when --keep-unknowns: {expected_keep}"
-
-
-def test_pattern_placeholders_and_explicit_flag(tmp_path: Path):
+def test_pattern_placeholders_and_explicit_flag(shared_inputs: Path, fixture_cache):
+    inputs = shared_inputs / "pattern_placeholders_and_explicit_flag"
     work = BUILD_DIR / "pattern"
     dest_root = work / "dest"
     dup_json = work / "dup.json"
 
-    src_mp3 = copy_test_audio("recognized_song.mp3", tmp_path / "explicit.mp3")
+    src_mp3 = copy_test_audio("recognized_song.mp3", inputs / "explicit.mp3", fixture_cache)
     mapping_path = work / "recognized.map.json"
 
     meta = {
@@ -345,7 +299,7 @@ def test_pattern_placeholders_and_explicit_flag(tmp_path: Path):
 
     pattern = "%G/%A - %S (%E)"  # %G defaults to Unknown, will be dropped unless kept
     # With default drop-unknowns, %G is removed leading to "Artist - Song (Explicit).mp3" at top-level
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
         "-p", pattern,
@@ -360,15 +314,16 @@ def test_pattern_placeholders_and_explicit_flag(tmp_path: Path):
     assert expected.exists(), f"Expected {expected}"
 
 
-def test_duplicates_identical_content_skipped(tmp_path: Path):
+def test_duplicates_identical_content_skipped(shared_inputs: Path, fixture_cache):
+    inputs = shared_inputs / "duplicates_identical_content_skipped"
     work = BUILD_DIR / "dups_identical"
     dest_root = work / "dest"
     dup_json = work / "duplicates.json"
     mapping_path = work / "recognized.map.json"
 
     # Two different source paths with identical content
-    src1 = copy_test_audio("recognized_song.mp3", tmp_path / "same1.mp3")
-    src2 = copy_test_audio("recognized_song.mp3", tmp_path / "same2.mp3")
+    src1 = copy_test_audio("recognized_song.mp3", inputs / "same1.mp3", fixture_cache)
+    src2 = copy_test_audio("recognized_song.mp3", inputs / "same2.mp3", fixture_cache)
 
     base_meta = {
         "author": "Dup Artist",
@@ -380,7 +335,7 @@ def test_duplicates_identical_content_skipped(tmp_path: Path):
     }
     write_recognized_mapping(mapping_path, {str(src1): base_meta, str(src2): base_meta})
 
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
         "--duplicates-json", str(dup_json),
@@ -389,15 +344,18 @@ def test_duplicates_identical_content_skipped(tmp_path: Path):
     assert proc.returncode == 0
 
     # Expect only one file in dest
-    expected_base = dest_root / f"{sanitize_component('Dup Artist')}/{sanitize_component('Dup Album')}/{sanitize_component('Dup Song')}.mp3"
+    a = sanitize_component("Dup Artist")
+    b = sanitize_component("Dup Album")
+    c = sanitize_component("Dup Song")
+    rel = f"{a}/{b}/{c}.mp3"
+    expected_base = dest_root / rel
     assert expected_base.exists()
     # The duplicate should be skipped as identical
     # Validate duplicates.json structure
-    with dup_json.open("r", encoding="utf-8") as f:
-        report = json.load(f)
+    report = _loads(dup_json.read_bytes())
     validate_duplicates_schema(report)
     # Find the group with our dest key
-    dest_key = f"{sanitize_component('Dup Artist')}/{sanitize_component('Dup Album')}/{sanitize_component('Dup Song')}.mp3".lower()
+    dest_key = rel.lower()
     groups = {g["dest_key"]: g for g in report.get("groups", [])}
     assert dest_key in groups, f"Expected duplicates group for key {dest_key}"
     statuses = [e["status"] for e in groups[dest_key]["entries"]]
@@ -409,15 +367,60 @@ def test_duplicates_identical_content_skipped(tmp_path: Path):
     assert stats["identical_duplicates_skipped"] >= 1
 
 
-def test_duplicates_differing_content_token_and_numeric_suffix(tmp_path: Path):
+@pytest.mark.parametrize(
+    "size",
+    [
+        100 * 1024,  # small enough to be compared byte by byte without a quick fingerprint
+        512 * 1024,  # large: head/tail fingerprints match, so only the full comparison tells them apart
+    ],
+    ids=["small", "large-same-head-and-tail"],
+)
+def test_duplicates_same_size_differing_only_in_middle_are_kept(tmp_path: Path, size: int):
+    work = BUILD_DIR / f"dups_middle_{size}"
+    dup_json = work / "duplicates.json"
+    mapping_path = work / "recognized.map.json"
+
+    content = bytes(range(256)) * (size // 256)
+    changed = bytearray(content)
+    changed[size // 2] ^= 0xFF
+    src1 = tmp_path / "one.mp3"
+    src2 = tmp_path / "two.mp3"
+    src1.write_bytes(content)
+    src2.write_bytes(bytes(changed))
+
+    meta = {
+        "author": "Middle",
+        "album": "Same",
+        "song": "Target",
+        "author_unknown": False,
+        "album_unknown": False,
+        "song_unknown": False,
+    }
+    write_recognized_mapping(mapping_path, {str(src1): meta, str(src2): meta})
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(work / "dest"),
+        "--duplicates-json", str(dup_json),
+    ])
+    assert proc.returncode == 0, proc.stderr
+    assert "Identical duplicates skipped: 0" in proc.stdout
+
+    report = _loads(dup_json.read_bytes())
+    statuses = [e["status"] for g in report["groups"] for e in g["entries"]]
+    assert statuses == ["planned", "planned"]
+
+
+def test_duplicates_differing_content_token_and_numeric_suffix(shared_inputs: Path, fixture_cache):
+    inputs = shared_inputs / "duplicates_differing_content_token_and_numeric_suffix"
     work = BUILD_DIR / "dups_different"
     dest_root = work / "dest"
     dup_json = work / "duplicates.json"
     mapping_path = work / "recognized.map.json"
 
     # Two different files (different content)
-    src1 = copy_test_audio("recognized_song.mp3", tmp_path / "diff1.mp3")
-    src2 = copy_test_audio("unrecognized_song.mp3", tmp_path / "diff2.mp3")
+    src1 = copy_test_audio("recognized_song.mp3", inputs / "diff1.mp3", fixture_cache)
+    src2 = copy_test_audio("unrecognized_song.mp3", inputs / "diff2.mp3", fixture_cache)
 
     meta = {
         "author": "Collide",
@@ -434,10 +437,11 @@ def test_duplicates_differing_content_token_and_numeric_suffix(tmp_path: Path):
     base_dir.mkdir(parents=True, exist_ok=True)
     stem = sanitize_component("Target")
     # The code will produce: Target_duplicate_diff2.mp3 for the second (default token)
-    pre_conflict = base_dir / f"{stem}_duplicate_{sanitize_component(src2.stem)}.mp3"
+    dup_stem = f"{stem}_duplicate_{sanitize_component(src2.stem)}"
+    pre_conflict = base_dir / f"{dup_stem}.mp3"
     pre_conflict.write_bytes(b"placeholder to force _2")
 
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
         "--duplicates-json", str(dup_json),
@@ -449,24 +453,23 @@ def test_duplicates_differing_content_token_and_numeric_suffix(tmp_path: Path):
     expected_first = base_dir / f"{stem}.mp3"
     assert expected_first.exists()
     # Second unique: with token and numeric suffix due to conflict
-    expected_second = base_dir / f"{stem}_duplicate_{sanitize_component(src2.stem)}_2.mp3"
+    expected_second = base_dir / f"{dup_stem}_2.mp3"
     assert expected_second.exists(), f"Expected numeric suffix due to pre-existing conflict: {expected_second}"
 
-    with dup_json.open("r", encoding="utf-8") as f:
-        report = json.load(f)
+    report = _loads(dup_json.read_bytes())
     validate_duplicates_schema(report)
     # Ensure stats reflect at least one kept duplicate and zero identical skips here
     stats = report["stats"]
     assert stats["distinct_duplicates_kept"] >= 1
 
 
-def test_missing_source_is_reported_but_not_fatal(tmp_path: Path):
+def test_missing_source_is_reported_but_not_fatal(shared_inputs: Path):
     work = BUILD_DIR / "missing"
     dest_root = work / "dest"
     dup_json = work / "duplicates.json"
     mapping_path = work / "recognized.map.json"
 
-    missing_path = (tmp_path / "does_not_exist.mp3").resolve()
+    missing_path = shared_inputs / "missing_source" / "does_not_exist.mp3"
     mapping = {
         str(missing_path): {
             "author": "Ghost",
@@ -479,7 +482,7 @@ def test_missing_source_is_reported_but_not_fatal(tmp_path: Path):
     }
     write_recognized_mapping(mapping_path, mapping)
 
-    proc = run_script([
+    proc = run_script(SCRIPT, [
         "-i", str(mapping_path),
         "-d", str(dest_root),
         "--duplicates-json", str(dup_json),
@@ -489,9 +492,319 @@ def test_missing_source_is_reported_but_not_fatal(tmp_path: Path):
     assert proc.returncode == 0
     assert "Missing sources (skipped):" in proc.stdout or "Missing source files" in proc.stdout
     # No operations applied in dry-run, no files created
-    assert not dest_root.exists() or not any(dest_root.rglob("*.mp3"))
+    assert not _has_mp3(dest_root)
     # Duplicates JSON should still be written and valid
     assert dup_json.exists()
-    with dup_json.open("r", encoding="utf-8") as f:
-        report = json.load(f)
+    report = _loads(dup_json.read_bytes())
     validate_duplicates_schema(report)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() == 0, reason="needs a non-root POSIX user for a read-only directory"
+)
+def test_apply_move_stops_at_first_failure_and_reports_it(tmp_path: Path, fixture_cache):
+    work = BUILD_DIR / "apply_failure"
+    shutil.rmtree(work, ignore_errors=True)
+    dest_root = work / "dest"
+    dup_json = work / "duplicates.json"
+    mapping_path = work / "recognized.map.json"
+
+    def meta(author: str) -> Dict[str, Any]:
+        return {
+            "author": author,
+            "album": "Album",
+            "song": "Song",
+            "author_unknown": False,
+            "album_unknown": False,
+            "song_unknown": False,
+        }
+
+    # The first planned op targets a read-only directory; the two after it must not be moved
+    srcs = [copy_test_audio("recognized_song.mp3", tmp_path / f"{name}.mp3", fixture_cache) for name in ("a", "b", "c")]
+    write_recognized_mapping(mapping_path, {
+        str(srcs[0]): meta("Locked"),
+        str(srcs[1]): meta("Open1"),
+        str(srcs[2]): meta("Open2"),
+    })
+    locked_dir = dest_root / "Locked" / "Album"
+    locked_dir.mkdir(parents=True)
+    locked_dir.chmod(0o555)
+    try:
+        proc = run_script(SCRIPT, [
+            "-i", str(mapping_path),
+            "-d", str(dest_root),
+            "--duplicates-json", str(dup_json),
+            "--apply",
+            "--move",
+            "-j", "4",
+        ])
+    finally:
+        locked_dir.chmod(0o755)
+
+    assert proc.returncode == 1, proc.stderr
+    # The summary is still printed, with the failure counted, and the failing op is named
+    assert "Summary:" in proc.stdout
+    assert "Failed:                 1" in proc.stdout
+    assert "Not attempted:          2" in proc.stdout
+    assert f"MOVE failed: {srcs[0]}" in proc.stderr
+    # Nothing after the failure was moved
+    assert all(src.exists() for src in srcs)
+    assert not _has_mp3(dest_root)
+
+
+def test_duplicates_with_same_source_basename_get_distinct_names(tmp_path: Path, fixture_cache):
+    work = BUILD_DIR / "dups_same_basename"
+    dest_root = work / "dest"
+    dup_json = work / "duplicates.json"
+    mapping_path = work / "recognized.map.json"
+    if dest_root.exists():
+        shutil.rmtree(dest_root)
+
+    # Three different contents; the last two share the source basename 'x.mp3'
+    src1 = copy_test_audio("recognized_song.mp3", tmp_path / "first.mp3", fixture_cache)
+    src2 = copy_test_audio("unrecognized_song.mp3", tmp_path / "a" / "x.mp3", fixture_cache)
+    src3 = copy_test_audio("recognized_song.mp3", tmp_path / "b" / "x.mp3", fixture_cache, link=False)
+    with src3.open("ab") as f:
+        f.write(b"\0")
+
+    meta = {
+        "author": "Clash",
+        "album": "Same",
+        "song": "Target",
+        "author_unknown": False,
+        "album_unknown": False,
+        "song_unknown": False,
+    }
+    write_recognized_mapping(mapping_path, {str(src1): meta, str(src2): meta, str(src3): meta})
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(dest_root),
+        "--duplicates-json", str(dup_json),
+        "--apply"
+    ])
+    assert proc.returncode == 0, proc.stderr
+
+    base_dir = dest_root / "Clash" / "Same"
+    assert compute_sha256(base_dir / "Target.mp3") == fixture_cache["recognized_song.mp3"][1]
+    # Planned names must not collide even though nothing exists on disk yet while planning
+    assert compute_sha256(base_dir / "Target_duplicate_x.mp3") == fixture_cache["unrecognized_song.mp3"][1]
+    assert compute_sha256(base_dir / "Target_duplicate_x_2.mp3") == compute_sha256(src3)
+
+
+def test_existing_name_differing_only_in_case(tmp_path: Path, fixture_cache):
+    work = BUILD_DIR / "existing_case"
+    shutil.rmtree(work, ignore_errors=True)
+    dest_root = work / "dest"
+    dup_json = work / "duplicates.json"
+    mapping_path = work / "recognized.map.json"
+
+    base_dir = dest_root / "Clash" / "Case"
+    base_dir.mkdir(parents=True)
+    (base_dir / "target.mp3").write_bytes(b"existing")
+    case_sensitive = not (base_dir / "TARGET.mp3").exists()
+
+    src = copy_test_audio("recognized_song.mp3", tmp_path / "one.mp3", fixture_cache)
+    meta = {
+        "author": "Clash",
+        "album": "Case",
+        "song": "Target",
+        "author_unknown": False,
+        "album_unknown": False,
+        "song_unknown": False,
+    }
+    write_recognized_mapping(mapping_path, {str(src): meta})
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(dest_root),
+        "--duplicates-json", str(dup_json),
+        "--apply"
+    ])
+    assert proc.returncode == 0, proc.stderr
+
+    # Same outcome as a plain os.path.exists check: a case-only match is a distinct file
+    # on a case-sensitive filesystem and a collision on a case-insensitive one
+    placed = base_dir / ("Target.mp3" if case_sensitive else "Target_2.mp3")
+    assert compute_sha256(placed) == fixture_cache["recognized_song.mp3"][1]
+    assert (base_dir / "target.mp3").read_bytes() == b"existing"
+
+
+def test_dry_run_with_file_blocking_destination_directory(tmp_path: Path, fixture_cache):
+    work = BUILD_DIR / "blocked_dest"
+    shutil.rmtree(work, ignore_errors=True)
+    dest_root = work / "dest"
+    dest_root.mkdir(parents=True)
+    # A regular file where the artist directory would go
+    (dest_root / "Artist").write_bytes(b"not a directory")
+    mapping_path = work / "recognized.map.json"
+
+    src = copy_test_audio("recognized_song.mp3", tmp_path / "a.mp3", fixture_cache)
+    write_recognized_mapping(mapping_path, {
+        str(src): {
+            "author": "Artist",
+            "album": "Album",
+            "song": "Song",
+            "author_unknown": False,
+            "album_unknown": False,
+            "song_unknown": False,
+        }
+    })
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(dest_root),
+        "--duplicates-json", str(work / "duplicates.json"),
+        "-v",
+    ])
+    assert proc.returncode == 0, proc.stderr
+    assert "Summary:" in proc.stdout
+    assert str(dest_root / "Artist" / "Album" / "Song.mp3") in proc.stdout
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() == 0, reason="needs a non-root POSIX user for an unreadable directory"
+)
+def test_unreadable_destination_directory_checks_each_candidate(tmp_path: Path, fixture_cache):
+    work = BUILD_DIR / "unreadable_dest"
+    shutil.rmtree(work, ignore_errors=True)
+    dest_root = work / "dest"
+    base_dir = dest_root / "Artist" / "Album"
+    base_dir.mkdir(parents=True)
+    (base_dir / "Song.mp3").write_bytes(b"existing")
+    mapping_path = work / "recognized.map.json"
+
+    src = copy_test_audio("recognized_song.mp3", tmp_path / "a.mp3", fixture_cache)
+    write_recognized_mapping(mapping_path, {
+        str(src): {
+            "author": "Artist",
+            "album": "Album",
+            "song": "Song",
+            "author_unknown": False,
+            "album_unknown": False,
+            "song_unknown": False,
+        }
+    })
+
+    # Searchable but not listable: names can be checked one by one, not scanned
+    base_dir.chmod(0o311)
+    try:
+        proc = run_script(SCRIPT, [
+            "-i", str(mapping_path),
+            "-d", str(dest_root),
+            "--duplicates-json", str(work / "duplicates.json"),
+            "-v",
+        ])
+    finally:
+        base_dir.chmod(0o755)
+    assert proc.returncode == 0, proc.stderr
+    assert str(base_dir / "Song_2.mp3") in proc.stdout
+
+
+def test_hash_cache_is_populated_and_reused(shared_inputs: Path, fixture_cache):
+    inputs = shared_inputs / "hash_cache_is_populated_and_reused"
+    work = BUILD_DIR / "hash_cache"
+    dup_json = work / "duplicates.json"
+    mapping_path = work / "recognized.map.json"
+    cache_path = work / "hashes.sqlite"
+    if cache_path.exists():
+        cache_path.unlink()
+
+    src1 = copy_test_audio("recognized_song.mp3", inputs / "one.mp3", fixture_cache)
+    src2 = copy_test_audio("recognized_song.mp3", inputs / "two.mp3", fixture_cache)
+    meta = {
+        "author": "Clash",
+        "album": "Cache",
+        "song": "Target",
+        "author_unknown": False,
+        "album_unknown": False,
+        "song_unknown": False,
+    }
+    write_recognized_mapping(mapping_path, {str(src1): meta, str(src2): meta})
+
+    args = [
+        "-i", str(mapping_path),
+        "-d", str(work / "dest"),
+        "--duplicates-json", str(dup_json),
+        "--hash", "sha256",
+        "--hash-cache", str(cache_path),
+    ]
+    proc = run_script(SCRIPT, args)
+    assert proc.returncode == 0, proc.stderr
+    assert "Identical duplicates skipped: 1" in proc.stdout
+
+    def cached_digests() -> Dict[str, str]:
+        conn = sqlite3.connect(str(cache_path))
+        try:
+            return dict(conn.execute("SELECT path, digest FROM hashes WHERE algorithm = 'sha256'").fetchall())
+        finally:
+            conn.close()
+
+    src_hash = fixture_cache["recognized_song.mp3"][1]
+    src1_key, src2_key = os.path.abspath(str(src1)), os.path.abspath(str(src2))
+    assert cached_digests() == {src1_key: src_hash, src2_key: src_hash}
+
+    # Tamper with one stored digest, keeping its size/mtime key: a run that reads the cache
+    # must now see two different files, where rehashing would find them identical
+    bogus = "0" * 64
+    conn = sqlite3.connect(str(cache_path))
+    try:
+        with conn:
+            conn.execute("UPDATE hashes SET digest = ? WHERE path = ?", (bogus, src2_key))
+    finally:
+        conn.close()
+
+    proc = run_script(SCRIPT, args)
+    assert proc.returncode == 0, proc.stderr
+    assert "Identical duplicates skipped: 0" in proc.stdout
+    assert cached_digests() == {src1_key: src_hash, src2_key: bogus}
+
+
+def _installed(package: str) -> bool:
+    return importlib.util.find_spec(package) is not None
+
+
+@pytest.mark.parametrize("algorithm,package", [("blake3", "blake3"), ("xxh3", "xxhash")])
+def test_hash_requires_its_package(tmp_path: Path, algorithm: str, package: str):
+    if _installed(package):
+        pytest.skip(f"{package} is installed")
+    mapping_path = write_recognized_mapping(tmp_path / "recognized.map.json", {})
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(tmp_path / "dest"),
+        "--duplicates-json", str(tmp_path / "duplicates.json"),
+        "--hash", algorithm,
+    ])
+    assert proc.returncode == 1
+    assert f"--hash {algorithm} requires the '{package}' package" in proc.stderr
+
+
+def test_auto_hash_falls_back_to_sha256(shared_inputs: Path, fixture_cache):
+    if _installed("blake3") or _installed("xxhash"):
+        pytest.skip("a faster hash package is installed")
+    inputs = shared_inputs / "auto_hash_falls_back_to_sha256"
+    work = BUILD_DIR / "auto_hash"
+    mapping_path = work / "recognized.map.json"
+
+    src1 = copy_test_audio("recognized_song.mp3", inputs / "one.mp3", fixture_cache)
+    src2 = copy_test_audio("recognized_song.mp3", inputs / "two.mp3", fixture_cache)
+    meta = {
+        "author": "Clash",
+        "album": "Auto",
+        "song": "Target",
+        "author_unknown": False,
+        "album_unknown": False,
+        "song_unknown": False,
+    }
+    write_recognized_mapping(mapping_path, {str(src1): meta, str(src2): meta})
+
+    proc = run_script(SCRIPT, [
+        "-i", str(mapping_path),
+        "-d", str(work / "dest"),
+        "--duplicates-json", str(work / "duplicates.json"),
+        "-v",
+    ])
+    assert proc.returncode == 0, proc.stderr
+    assert "Hash: sha256" in proc.stdout
+    assert "Identical duplicates skipped: 1" in proc.stdout
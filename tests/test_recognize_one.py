@@ -1,111 +1,237 @@
-import json
+import os
+import selectors
 import sys
 import subprocess
-import os
+import tempfile
+import time
 from pathlib import Path
+from types import MappingProxyType
 import pytest
 
+from conftest import DATA_DIR, PIPE_BUFSIZE, ROOT, STUB_ENV, _loads, run_script
+
 
-ROOT = Path(__file__).resolve().parents[1]
 SCRIPT = ROOT / "recognize_one.py"
-DATA_DIR = ROOT / "tests" / "data"
+# String forms resolved once for the subprocess calls, and the data file names used as data_files keys
+ROOT_STR = str(ROOT)
+SCRIPT_STR = str(SCRIPT)
+RECOGNIZED_MP3 = "recognized_song.mp3"
+UNRECOGNIZED_MP3 = "unrecognized_song.mp3"
+UNRECOGNIZED_JSON = "unrecognized_song.json"
+# Core scalar track fields expected to be stable across recognitions
+STABLE_TRACK_KEYS = ("key", "title", "subtitle", "url", "layout", "type")
+# Recognizer runs use the 'shazamio' stub and keep output as bytes (_loads takes them directly;
+# nothing is decoded unless a message needs it); the stubbed recognizer answers within seconds
+RUN_OPTIONS = {"timeout": 20, "stub_shazamio": True, "binary": True}
+
+
+@pytest.fixture(scope="module")
+def recognize_runs():
+    """
+    Memoized run_script: returns a function mapping an audio path to its finished run,
+    so each distinct input is recognized once per module however many tests inspect it.
+    """
+    cache: dict[str, subprocess.CompletedProcess] = {}
+
+    def _run(path: Path) -> subprocess.CompletedProcess:
+        key = str(path)
+        if key not in cache:
+            cache[key] = run_script(SCRIPT, [key], **RUN_OPTIONS)
+        return cache[key]
+
+    return _run
+
 
+# Longest wait for one server reply before the server is killed and the test fails
+SERVER_REPLY_TIMEOUT = 20
 
-def run_script(args: list[str], timeout: int = 90) -> subprocess.CompletedProcess:
+
+@pytest.fixture(scope="module")
+def recognize_server():
     """
-    Execute recognize_one.py with provided args, capturing stdout/stderr.
-    Uses the current repo root as cwd to ensure relative paths resolve.
-    Injects tests/stubs into PYTHONPATH so recognize_one.py imports the test 'shazamio' stub.
+    One 'recognize_one.py --server' subprocess (with the shazamio stub) for the whole module.
+    Yields send(path) -> parsed JSON reply; the server exits when its stdin is closed.
+    stderr goes to a temp file (shown if the server dies) so it can never fill a pipe, and
+    each reply is awaited for at most SERVER_REPLY_TIMEOUT seconds.
     """
-    cmd = [sys.executable, str(SCRIPT), *args]
-    stub_dir = ROOT / "tests" / "stubs"
-    env = os.environ.copy()
-    existing = env.get("PYTHONPATH", "")
-    env["PYTHONPATH"] = f"{stub_dir}{os.pathsep}{existing}" if existing else str(stub_dir)
-    return subprocess.run(
-        cmd,
-        cwd=str(ROOT),
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-        check=False,
-        env=env,
+    err_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        [sys.executable, SCRIPT_STR, "--server"],
+        cwd=ROOT_STR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=err_file,
+        bufsize=0,
+        env=STUB_ENV,
     )
+    sel = selectors.DefaultSelector()
+    sel.register(proc.stdout, selectors.EVENT_READ)
+    pending = bytearray()
+
+    def server_stderr() -> str:
+        err_file.seek(0)
+        return err_file.read().decode("utf-8", "replace")
+
+    def read_line() -> bytes:
+        deadline = time.monotonic() + SERVER_REPLY_TIMEOUT
+        while b"\n" not in pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not sel.select(remaining):
+                proc.kill()
+                pytest.fail(f"No server reply within {SERVER_REPLY_TIMEOUT}s; stderr: {server_stderr()!r}")
+            chunk = os.read(proc.stdout.fileno(), PIPE_BUFSIZE)
+            if not chunk:
+                pytest.fail(f"Server exited early: {server_stderr()!r}")
+            pending.extend(chunk)
+        end = pending.index(b"\n") + 1
+        line = bytes(pending[:end])
+        del pending[:end]
+        return line
+
+    def send(path: Path):
+        proc.stdin.write(os.fsencode(path) + b"\n")
+        return _loads(read_line())
+
+    try:
+        yield send
+    finally:
+        sel.close()
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        err_file.close()
 
 
 def test_usage_no_args():
     # When no args are provided, script should exit with code 2 and print usage to stderr.
     proc = subprocess.run(
-        [sys.executable, str(SCRIPT)],
-        cwd=str(ROOT),
+        [sys.executable, SCRIPT_STR],
+        cwd=ROOT_STR,
         capture_output=True,
-        text=True,
         check=False,
     )
     assert proc.returncode == 2, f"Expected exit code 2 for missing args, got {proc.returncode}"
-    assert "Usage:" in proc.stderr and "recognize_one.py <audio_file>" in proc.stderr, (
-        f"Expected usage message on stderr, got: {proc.stderr!r}"
+    assert b"Usage:" in proc.stderr and b"recognize_one.py <audio_file>" in proc.stderr, (
+        f"Expected usage message on stderr, got: {proc.stderr.decode(errors='replace')!r}"
     )
     # Ensure nothing leaks to stdout in usage case
-    assert proc.stdout.strip() == ""
+    assert proc.stdout.strip() == b""
 
 
-def test_unrecognized_file_returns_nonzero_and_warns():
-    audio_path = DATA_DIR / "unrecognized_song.mp3"
-    assert audio_path.exists(), f"Missing test data: {audio_path}"
+def test_unrecognized_file_returns_nonzero_and_warns(recognize_runs, data_files):
+    audio_path = data_files.get(UNRECOGNIZED_MP3)
+    assert audio_path is not None, f"Missing test data: {DATA_DIR}/{UNRECOGNIZED_MP3}"
 
-    proc = run_script([str(audio_path)])
+    proc = recognize_runs(audio_path)
 
     # shazamio returns a successful response with empty matches when nothing is recognized
     assert proc.returncode == 0, f"Expected exit code 0 for unrecognized audio, got {proc.returncode}"
 
     # No warnings expected on stderr
-    assert proc.stderr.strip() == "", f"Expected no stderr, got: {proc.stderr!r}"
+    assert proc.stderr.strip() == b"", f"Expected no stderr, got: {proc.stderr.decode(errors='replace')!r}"
 
-    # JSON should be emitted on stdout and contain an empty matches array
-    assert proc.stdout.strip() != "", "Expected JSON on stdout"
-    payload = json.loads(proc.stdout)
-    assert "matches" in payload, "Expected 'matches' key in JSON"
-    assert isinstance(payload["matches"], list), "'matches' should be a list"
-    assert len(payload["matches"]) == 0, f"Expected no matches, got {len(payload['matches'])}"
+    # JSON on stdout must match the golden empty-matches response byte for byte (no parse needed)
+    golden_path = data_files.get(UNRECOGNIZED_JSON)
+    assert golden_path is not None, f"Missing test data: {DATA_DIR}/{UNRECOGNIZED_JSON}"
+    assert proc.stdout.rstrip(b"\n") == golden_path.read_bytes().rstrip(b"\n"), (
+        f"Expected empty matches, got: {proc.stdout[:200].decode(errors='replace')!r}"
+    )
 
 
-def test_recognized_file_matches_expected_json():
-    audio_path = DATA_DIR / "recognized_song.mp3"
-    expected_json_path = DATA_DIR / "recognized_song.json"
+@pytest.fixture(scope="module")
+def recognized_obj(recognize_runs, data_files) -> MappingProxyType:
+    """
+    recognize_one.py's output for recognized_song.mp3, decoded once per module.
+    Returned as a read-only MappingProxyType; nested objects are shared too, so callers must not modify them.
+    """
+    return MappingProxyType(_loads(recognize_runs(data_files[RECOGNIZED_MP3]).stdout))
 
-    assert audio_path.exists(), f"Missing test data: {audio_path}"
 
-    if not expected_json_path.exists():
-        pytest.skip(
-            f"Expected JSON snapshot not found: {expected_json_path}. "
-            "Generate it by running: python recognize_one.py tests/data/recognized_song.mp3 > tests/data/recognized_song.json"
-        )
+def test_recognized_file_matches_expected_json(expected_snapshot, recognize_runs, data_files, recognized_obj):
+    # expected_snapshot comes first so a missing snapshot skips before anything is recognized
+    audio_path = data_files.get(RECOGNIZED_MP3)
+    assert audio_path is not None, f"Missing test data: {DATA_DIR}/{RECOGNIZED_MP3}"
 
-    proc = run_script([str(audio_path)])
+    proc = recognize_runs(audio_path)
 
     # Success should return 0 and emit JSON only to stdout
     assert proc.returncode == 0, f"Expected exit code 0 for recognized audio, got {proc.returncode}"
-    assert proc.stderr.strip() == "", f"Expected no stderr on success, got: {proc.stderr!r}"
-    assert proc.stdout.strip() != "", "Expected JSON on stdout, got empty output"
+    assert proc.stderr.strip() == b"", f"Expected no stderr on success, got: {proc.stderr.decode(errors='replace')!r}"
+    assert proc.stdout.strip() != b"", "Expected JSON on stdout, got empty output"
 
-    # Compare a stable subset from snapshot to avoid volatile fields (timestamp, tagid, etc.)
-    actual_obj = json.loads(proc.stdout)
-    with expected_json_path.open("r", encoding="utf-8") as f:
-        expected_obj = json.load(f)
-
-    exp_track = expected_obj.get("track", {})
+    # Compare a stable subset from snapshot to avoid volatile fields (timestamp, tagid, etc.);
+    # test_track_field reports the same fields one by one for the batch run
+    actual_obj = recognized_obj
+    exp_track = expected_snapshot.get("track", {})
     act_track = actual_obj.get("track", {})
-
-    # Core scalar fields expected to be stable
-    for key in ["key", "title", "subtitle", "url", "layout", "type"]:
-        assert act_track.get(key) == exp_track.get(key), f"track.{key} mismatch"
+    assert {k: act_track.get(k) for k in STABLE_TRACK_KEYS} == {k: exp_track.get(k) for k in STABLE_TRACK_KEYS}, (
+        "Stable track fields mismatch"
+    )
 
     # Artists (compare adamid set)
     def artist_adamids(track):
-        return {a.get("adamid") for a in track.get("artists", []) if a.get("adamid")}
+        # One lookup per artist; filter(None, ...) drops artists without an adamid
+        return frozenset(filter(None, (a.get("adamid") for a in track.get("artists", ()))))
     assert artist_adamids(act_track) == artist_adamids(exp_track), "Artist adamids mismatch"
 
     # Ensure at least one match is present (count may vary)
     assert isinstance(actual_obj.get("matches"), list), "'matches' should be a list"
     assert len(actual_obj["matches"]) >= 1, "Expected at least one match"
+
+
+@pytest.fixture(scope="module")
+def batch_results(data_files):
+    """
+    Both audio files recognized by one batch-mode run ('<path>\t<json>' per line),
+    returned as {path: parsed JSON} together with the finished run.
+    """
+    paths = [str(data_files[UNRECOGNIZED_MP3]), str(data_files[RECOGNIZED_MP3])]
+    proc = run_script(SCRIPT, paths, **RUN_OPTIONS)
+    results = {}
+    for line in proc.stdout.splitlines():
+        path, _, payload = line.partition(b"\t")
+        results[os.fsdecode(path)] = _loads(payload)
+    return results, proc
+
+
+@pytest.fixture(scope="module")
+def actual_track(batch_results, data_files):
+    """The 'track' object recognize_one.py emits for recognized_song.mp3 (shared batch run)."""
+    results, proc = batch_results
+    assert proc.returncode == 0, f"Expected exit code 0 for batch run, got {proc.returncode}"
+    return results[str(data_files[RECOGNIZED_MP3])].get("track", {})
+
+
+@pytest.fixture(scope="module")
+def expected_track(expected_snapshot):
+    """The 'track' object from the recognized_song.json snapshot."""
+    return expected_snapshot.get("track", {})
+
+
+# expected_track is requested first so a missing snapshot skips before the batch run starts
+@pytest.mark.parametrize("key", STABLE_TRACK_KEYS)
+def test_track_field(key, expected_track, actual_track):
+    assert actual_track.get(key) == expected_track.get(key), f"track.{key} mismatch"
+
+
+def test_batch_mode_emits_one_line_per_file(expected_snapshot, batch_results, data_files):
+    results, proc = batch_results
+    assert proc.returncode == 0, f"Expected exit code 0 for batch run, got {proc.returncode}"
+    assert proc.stderr.strip() == b"", f"Expected no stderr, got: {proc.stderr.decode(errors='replace')!r}"
+    assert list(results) == [str(data_files[UNRECOGNIZED_MP3]), str(data_files[RECOGNIZED_MP3])]
+    assert results[str(data_files[UNRECOGNIZED_MP3])] == {"matches": []}
+    assert results[str(data_files[RECOGNIZED_MP3])]["track"]["key"] == expected_snapshot["track"]["key"]
+
+
+def test_server_mode_answers_each_request(expected_snapshot, recognize_server, data_files):
+    # Requests are answered in order, one JSON line each, by the same server process
+    unrecognized = recognize_server(data_files[UNRECOGNIZED_MP3])
+    assert unrecognized == {"matches": []}
+
+    recognized = recognize_server(data_files[RECOGNIZED_MP3])
+    assert recognized.get("track", {}).get("key") == expected_snapshot["track"]["key"]
+    assert len(recognized.get("matches", [])) >= 1, "Expected at least one match"